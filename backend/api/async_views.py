@@ -0,0 +1,167 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.shortcuts import aget_object_or_404
+from django.utils.translation import gettext as _
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.authentication import (
+    TokenAuthentication,
+    get_authorization_header,
+)
+from rest_framework.exceptions import (
+    AuthenticationFailed,
+    NotAuthenticated,
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from api.views import (
+    IngredientAPIViewSet,
+    RecipeAPIViewSet,
+    UserActionsViewSet,
+)
+from ingredients.catalog import ingredient_catalog
+
+
+async def authenticate(request):
+    authentication = TokenAuthentication()
+    header = get_authorization_header(request).split()
+    if (
+        not header
+        or header[0].lower() != authentication.keyword.lower().encode()
+    ):
+        return AnonymousUser()
+    if len(header) != 2:
+        return (await sync_to_async(authentication.authenticate)(request))[0]
+    try:
+        key = header[1].decode()
+    except UnicodeError:
+        return (await sync_to_async(authentication.authenticate)(request))[0]
+    token = (
+        await authentication.get_model()
+        .objects.select_related("user")
+        .filter(key=key)
+        .afirst()
+    )
+    if token is None:
+        raise AuthenticationFailed(_("Invalid token."))
+    if not token.user.is_active:
+        raise AuthenticationFailed(_("User inactive or deleted."))
+    return token.user
+
+
+def async_read_view(viewset, action, read, fallback_actions):
+    fallback = viewset.as_view(fallback_actions)
+
+    def accepts_json(request):
+        return request.GET.get("format", "json") == "json" and (
+            "text/html" not in request.headers.get("Accept", "")
+        )
+
+    @csrf_exempt
+    async def view(request, *args, **kwargs):
+        if request.method != "GET" or not accepts_json(request):
+            return await sync_to_async(fallback)(request, *args, **kwargs)
+        drf_request = Request(request, authenticators=())
+        drf_request.accepted_renderer = JSONRenderer()
+        drf_request.accepted_media_type = JSONRenderer.media_type
+        instance = viewset(
+            request=drf_request,
+            args=args,
+            kwargs=kwargs,
+            action=action,
+            format_kwarg=None,
+            action_map=fallback_actions,
+        )
+        instance.headers = instance.default_response_headers
+        try:
+            drf_request.user = await authenticate(request)
+            response = await read(instance, drf_request, *args, **kwargs)
+        except Exception as exc:
+            response = instance.handle_exception(exc)
+        return instance.finalize_response(
+            drf_request, response, *args, **kwargs
+        )
+
+    return view
+
+
+async def get_serializer_context(view, request):
+    context = view.get_serializer_context()
+    if request.user.is_authenticated:
+        context["subscribed_author_ids"] = {
+            author_id
+            async for author_id in request.user.subscriptions.values_list(
+                "author_id", flat=True
+            )
+        }
+    return context
+
+
+async def list_recipes(view, request):
+    queryset = await sync_to_async(view.filter_queryset)(view.get_queryset())
+    recipes = await view.paginator.apaginate_queryset(queryset, request, view)
+    serializer = view.get_serializer_class()(
+        recipes,
+        many=True,
+        context=await get_serializer_context(view, request),
+    )
+    await serializer.child.aload_shared_representations(recipes)
+    return view.get_paginated_response(serializer.data)
+
+
+async def retrieve_recipe(view, request, pk):
+    recipe = await aget_object_or_404(view.get_queryset(), pk=pk)
+    serializer = view.get_serializer_class()(
+        recipe, context=await get_serializer_context(view, request)
+    )
+    await serializer.aload_shared_representations([recipe])
+    return Response(serializer.data)
+
+
+async def list_subscriptions(view, request):
+    if not request.user.is_authenticated:
+        raise NotAuthenticated
+    authors = await view.paginator.apaginate_queryset(
+        view.get_subscriptions_queryset(request), request, view
+    )
+    serializer = view.get_serializer(authors, many=True)
+    return view.get_paginated_response(serializer.data)
+
+
+async def list_ingredients(view, request):
+    catalog = await ingredient_catalog.alookup(
+        request.query_params.get("name", "")
+    )
+    return view.get_catalog_response(request, *catalog)
+
+
+recipe_list = async_read_view(
+    RecipeAPIViewSet,
+    "list",
+    list_recipes,
+    {"get": "list", "post": "create"},
+)
+recipe_detail = async_read_view(
+    RecipeAPIViewSet,
+    "retrieve",
+    retrieve_recipe,
+    {
+        "get": "retrieve",
+        "put": "update",
+        "patch": "partial_update",
+        "delete": "destroy",
+    },
+)
+subscriptions = async_read_view(
+    UserActionsViewSet,
+    "subscriptions",
+    list_subscriptions,
+    {"get": "subscriptions"},
+)
+ingredient_list = async_read_view(
+    IngredientAPIViewSet,
+    "list",
+    list_ingredients,
+    {"get": "list"},
+)
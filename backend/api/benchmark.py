@@ -0,0 +1,117 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import requests
+
+from foodgram_back.settings import BASE_DIR, METRICS_FLUSH_INTERVAL
+
+SERVER_START_TIMEOUT = 30
+METRICS_READ_MARGIN = 0.5
+
+
+@contextmanager
+def run_server(deployment, port, workers, env=None):
+    # gunicorn.conf.py picks the interface, as in the Docker image.
+    env = {**os.environ, **(env or {}), "SERVER_INTERFACE": deployment}
+    env.pop("DJANGO_ROOT_URLCONF", None)
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "-b",
+            f"127.0.0.1:{port}",
+            "-w",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        cwd=BASE_DIR,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_for_server(process, base_url)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def wait_for_server(process, base_url):
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Сервер завершился при запуске")
+        try:
+            requests.get(f"{base_url}/api/", timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError("Сервер не запустился вовремя")
+
+
+def percentile(values, share):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def run_load(base_url, scenarios, concurrency):
+    sessions = threading.local()
+
+    def send(method, path, headers, body):
+        session = getattr(sessions, "session", None)
+        if session is None:
+            session = sessions.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            response = session.request(
+                method, base_url + path, headers=headers, json=body
+            )
+            failed = response.status_code >= 500
+        except requests.RequestException:
+            failed = True
+        return time.perf_counter() - started, failed
+
+    def play(scenario):
+        return [send(*call) for call in scenario]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = [
+            result
+            for scenario_results in executor.map(play, scenarios)
+            for result in scenario_results
+        ]
+    elapsed = time.perf_counter() - started
+    latencies = [latency * 1000 for latency, _ in results]
+    return {
+        "requests": len(results),
+        "errors": sum(failed for _, failed in results),
+        "elapsed": elapsed,
+        "throughput": len(results) / max(elapsed, 1e-6),
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+    }
+
+
+def read_request_totals(base_url):
+    # Other workers publish their totals once per flush interval.
+    time.sleep(METRICS_FLUSH_INTERVAL + METRICS_READ_MARGIN)
+    requests_total = queries_total = 0
+    for line in requests.get(f"{base_url}/metrics").text.splitlines():
+        if 'view="metrics"' in line:
+            continue
+        if line.startswith("foodgram_request_duration_seconds_count{"):
+            requests_total += int(float(line.rsplit(" ", 1)[1]))
+        elif line.startswith("foodgram_sql_queries_total{"):
+            queries_total += int(float(line.rsplit(" ", 1)[1]))
+    return requests_total, queries_total
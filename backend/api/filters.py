@@ -1,15 +1,27 @@
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
+from django.db.models import F, Q
 from django_filters.rest_framework import FilterSet, filters
 from recipes.models import Recipe
 from ingredients.models import Ingredient
 
+from foodgram_back.settings import (
+    RECIPE_SEARCH_CONFIG,
+    RECIPE_SEARCH_MIN_SUBSTRING_LENGTH,
+)
+
 
 class CustomRecipeFilter(FilterSet):
     is_favorited = filters.BooleanFilter(method="filter_by_favorite_status")
     is_in_shopping_cart = filters.BooleanFilter(method="filter_by_cart_status")
+    search = filters.CharFilter(method="filter_by_search")
 
     class Meta:
         model = Recipe
-        fields = ("author", "is_favorited", "is_in_shopping_cart")
+        fields = ("author", "is_favorited", "is_in_shopping_cart", "search")
 
     def get_current_user(self):
         request = self.request
@@ -29,6 +41,24 @@ class CustomRecipeFilter(FilterSet):
             return queryset.filter(shopping_carts__user=user)
         return queryset
 
+    def filter_by_search(self, queryset, field_name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        query = SearchQuery(
+            value, config=RECIPE_SEARCH_CONFIG, search_type="websearch"
+        )
+        condition = Q(search_vector=query)
+        search_rank = SearchRank(F("search_vector"), query)
+        if len(value) >= RECIPE_SEARCH_MIN_SUBSTRING_LENGTH:
+            condition |= Q(name__icontains=value)
+            search_rank += TrigramWordSimilarity(value, "name")
+        return (
+            queryset.filter(condition)
+            .annotate(search_rank=search_rank)
+            .order_by("-search_rank", "-created_at", "-id")
+        )
+
 
 class CustomIngredientFilter(FilterSet):
     name = filters.CharFilter(lookup_expr="istartswith")
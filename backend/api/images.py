@@ -0,0 +1,112 @@
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from foodgram_back.settings import (
+    IMAGE_VARIANT_QUALITY,
+    IMAGE_VARIANT_WEBP,
+    IMAGE_VARIANTS,
+)
+
+VARIANTS_DIR = "variants"
+
+logger = logging.getLogger(__name__)
+executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="images")
+
+
+def get_variant_name(name, variant, extension=None):
+    directory, filename = posixpath.split(name)
+    stem, original_extension = posixpath.splitext(filename)
+    return posixpath.join(
+        directory,
+        VARIANTS_DIR,
+        f"{stem}_{variant}{extension or original_extension}",
+    )
+
+
+def iter_variant_names(name):
+    for variant in IMAGE_VARIANTS:
+        yield variant, get_variant_name(name, variant)
+        if IMAGE_VARIANT_WEBP:
+            yield f"{variant}_webp", get_variant_name(name, variant, ".webp")
+
+
+def save_variant(image, name):
+    extension = posixpath.splitext(name)[1].lower()
+    image_format = Image.registered_extensions().get(extension, "PNG")
+    options = {"optimize": True}
+    if image_format in ("JPEG", "WEBP"):
+        options["quality"] = IMAGE_VARIANT_QUALITY
+    if image_format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, **options)
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def generate_variants(name, overwrite=False):
+    variants = dict(iter_variant_names(name))
+    if not overwrite:
+        variants = {
+            variant: variant_name
+            for variant, variant_name in variants.items()
+            if not default_storage.exists(variant_name)
+        }
+    if not variants or not default_storage.exists(name):
+        return 0
+    with default_storage.open(name) as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+    for variant, variant_name in variants.items():
+        resized = image.copy()
+        resized.thumbnail(IMAGE_VARIANTS[variant.removesuffix("_webp")])
+        save_variant(resized, variant_name)
+    return len(variants)
+
+
+def has_variants(name):
+    return all(
+        default_storage.exists(variant_name)
+        for _, variant_name in iter_variant_names(name)
+    )
+
+
+def generate_variants_safely(name, on_done=None):
+    try:
+        generate_variants(name)
+        if on_done is not None and has_variants(name):
+            on_done()
+    except Exception:
+        logger.exception("Не удалось создать копии изображения %s", name)
+    finally:
+        connections.close_all()
+
+
+def schedule_variants(image_field, on_done=None):
+    if not image_field:
+        return
+    name = image_field.name
+    transaction.on_commit(
+        lambda: executor.submit(generate_variants_safely, name, on_done)
+    )
+
+
+def get_variant_urls(image_field, variants_source, request=None):
+    if not image_field:
+        return None
+    ready = variants_source == image_field.name
+    variant_urls = {}
+    for variant, variant_name in iter_variant_names(image_field.name):
+        url = default_storage.url(variant_name) if ready else image_field.url
+        variant_urls[variant] = (
+            request.build_absolute_uri(url) if request else url
+        )
+    return variant_urls
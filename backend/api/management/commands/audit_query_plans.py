@@ -0,0 +1,165 @@
+import json
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from api.views import RecipeAPIViewSet, UserActionsViewSet
+from foodgram_back.settings import PAGE_SIZE
+from ingredients.models import Ingredient
+from recipes.models import Favorite, Recipe, RecipeIngredient, ShoppingCart
+from users.models import Subscription, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Выполняет EXPLAIN ANALYZE для основных запросов API и сообщает "
+        "о последовательных сканированиях"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user-id",
+            type=int,
+            help="Пользователь, от имени которого строятся запросы",
+        )
+        parser.add_argument(
+            "--min-rows",
+            type=int,
+            default=1000,
+            help="Не отмечать сканирования таблиц меньше этого числа строк",
+        )
+        parser.add_argument(
+            "--fail-on-seq-scan",
+            action="store_true",
+            help="Завершиться с ошибкой, если найдены сканирования",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Команда работает только с PostgreSQL.")
+        user = self.get_user(options["user_id"])
+        flagged = []
+        for name, queryset in self.get_queries(user):
+            plan = json.loads(queryset.explain(format="json", analyze=True))
+            seq_scans = [
+                (node["Relation Name"], rows)
+                for node, rows in self.iter_seq_scans(plan[0]["Plan"])
+                if rows >= options["min_rows"]
+            ]
+            style = self.style.ERROR if seq_scans else self.style.SUCCESS
+            self.stdout.write(
+                style(
+                    f"{name}: cost={plan[0]['Plan']['Total Cost']:.2f} "
+                    f"time={plan[0]['Execution Time']:.2f} ms"
+                )
+            )
+            for relation, rows in seq_scans:
+                self.stdout.write(f"    Seq Scan on {relation} ({rows} строк)")
+                flagged.append((name, relation))
+        if flagged and options["fail_on_seq_scan"]:
+            raise CommandError(
+                f"Последовательных сканирований: {len(flagged)}"
+            )
+
+    def get_user(self, user_id):
+        if user_id is not None:
+            return User.objects.get(pk=user_id)
+        user = (
+            User.objects.annotate(carts=Count("shopping_carts"))
+            .order_by("-carts")
+            .first()
+        )
+        if user is None:
+            raise CommandError("В базе нет пользователей.")
+        return user
+
+    def iter_seq_scans(self, node):
+        if node.get("Node Type") == "Seq Scan":
+            rows = node.get("Actual Rows", 0) + node.get(
+                "Rows Removed by Filter", 0
+            )
+            yield node, rows * node.get("Actual Loops", 1)
+        for child in node.get("Plans", ()):
+            yield from self.iter_seq_scans(child)
+
+    def make_request(self, user, params=None):
+        request = Request(RequestFactory().get("/", params or {}))
+        request.user = user
+        return request
+
+    def recipe_list(self, user, params=None):
+        view = RecipeAPIViewSet(
+            request=self.make_request(user, params),
+            action="list",
+            format_kwarg=None,
+            kwargs={},
+        )
+        return view.filter_queryset(view.get_queryset())
+
+    def get_queries(self, user):
+        anonymous = AnonymousUser()
+        author = (
+            User.objects.annotate(recipes_total=Count("recipes"))
+            .order_by("-recipes_total")
+            .first()
+        )
+        page_ids = list(
+            self.recipe_list(anonymous).values_list("id", flat=True)[
+                :PAGE_SIZE
+            ]
+        )
+        middle = Recipe.objects.order_by("-created_at")[
+            Recipe.objects.count() // 2:
+        ].first()
+        subscriptions_view = UserActionsViewSet(
+            request=self.make_request(user, {"recipes_limit": 3}),
+            action="subscriptions",
+            format_kwarg=None,
+            kwargs={},
+        )
+        yield "recipe-list (anonymous)", self.recipe_list(anonymous)[
+            :PAGE_SIZE
+        ]
+        yield "recipe-list", self.recipe_list(user)[:PAGE_SIZE]
+        for params in (
+            {"author": author.pk},
+            {"is_favorited": 1},
+            {"is_in_shopping_cart": 1},
+        ):
+            name = f"recipe-list {next(iter(params))}"
+            yield name, self.recipe_list(user, params)[:PAGE_SIZE]
+        if middle is not None:
+            yield "recipe-list cursor", self.recipe_list(user).filter(
+                created_at__lt=middle.created_at
+            ).order_by("-created_at", "-id")[:PAGE_SIZE]
+        yield "recipe-list ingredients", RecipeIngredient.objects.filter(
+            recipe_id__in=page_ids
+        ).select_related("ingredient")
+        yield "user-subscriptions", (
+            subscriptions_view.get_subscriptions_queryset(
+                subscriptions_view.request
+            )[:PAGE_SIZE]
+        )
+        yield "user-subscribe exists", Subscription.objects.filter(
+            subscriber=user, author=author
+        )[:1]
+        yield "user-followers", Subscription.objects.filter(author=author)
+        yield "recipe-favorite exists", Favorite.objects.filter(
+            user=user, recipe_id__in=page_ids[:1]
+        )[:1]
+        yield "recipe-shopping_cart exists", ShoppingCart.objects.filter(
+            user=user, recipe_id__in=page_ids[:1]
+        )[:1]
+        yield "recipe-shopping_cart by recipe", ShoppingCart.objects.filter(
+            recipe_id__in=page_ids
+        )
+        yield "recipe-download_shopping_cart", (
+            RecipeAPIViewSet().compile_ingredient_data(user)
+        )
+        yield "ingredient-list name", Ingredient.objects.filter(
+            name__istartswith="а"
+        )
@@ -0,0 +1,100 @@
+from itertools import cycle, islice
+
+from django.core.management.base import BaseCommand
+from rest_framework.authtoken.models import Token
+
+from api.benchmark import run_load, run_server
+from users.models import User
+
+DEFAULT_PATHS = (
+    "/api/recipes/",
+    "/api/recipes/?limit=6&page=2",
+    "/api/ingredients/?name=а",
+    "/api/users/subscriptions/?recipes_limit=3",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает синхронный (WSGI) и асинхронный (ASGI) запуск "
+        "на основных запросах чтения"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            action="append",
+            dest="paths",
+            help="Адрес для нагрузки, можно указать несколько раз",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=2000,
+            help="Общее количество запросов к каждому варианту",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=64,
+            help="Количество одновременных запросов",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=2,
+            help="Количество процессов gunicorn",
+        )
+        parser.add_argument(
+            "--port",
+            type=int,
+            default=8765,
+            help="Порт, на котором запускается сервер",
+        )
+        parser.add_argument(
+            "--user-id",
+            type=int,
+            help="Пользователь, от имени которого отправляются запросы",
+        )
+        parser.add_argument(
+            "--deployment",
+            action="append",
+            choices=("wsgi", "asgi"),
+            dest="deployments",
+            help="Запускаемые варианты, по умолчанию оба",
+        )
+
+    def handle(self, *args, **options):
+        headers = self.get_headers(options["user_id"])
+        calls = list(
+            islice(
+                cycle(
+                    [("GET", path, headers, None)]
+                    for path in options["paths"] or DEFAULT_PATHS
+                ),
+                options["requests"],
+            )
+        )
+        for deployment in options["deployments"] or ("wsgi", "asgi"):
+            with run_server(
+                deployment, options["port"], options["workers"]
+            ) as base_url:
+                run_load(base_url, calls[: options["concurrency"]], 8)
+                result = run_load(base_url, calls, options["concurrency"])
+            self.stdout.write(
+                f"{deployment}: {result['throughput']:.1f} запр/с, "
+                f"p50={result['p50']:.1f} мс, "
+                f"p95={result['p95']:.1f} мс, "
+                f"p99={result['p99']:.1f} мс, "
+                f"ошибок: {result['errors']}"
+            )
+
+    def get_headers(self, user_id):
+        users = User.objects.order_by("pk")
+        user = (
+            users.get(pk=user_id) if user_id is not None else users.first()
+        )
+        if user is None:
+            return {}
+        token, _ = Token.objects.get_or_create(user=user)
+        return {"Authorization": f"Token {token.key}"}
@@ -0,0 +1,132 @@
+import threading
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import RequestFactory
+
+from api.benchmark import percentile
+from foodgram_back.db_pool import (
+    CONNECTION_MODES,
+    get_connection_settings,
+    get_pool,
+    get_pool_stats,
+)
+from foodgram_back.settings import DB_CONN_MAX_AGE, DB_POOL_OPTIONS
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает задержку списка рецептов при разных режимах "
+        "подключения к базе данных"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--mode",
+            action="append",
+            choices=CONNECTION_MODES,
+            dest="modes",
+            help="Проверяемые режимы, по умолчанию все",
+        )
+        parser.add_argument(
+            "--path",
+            default="/api/recipes/",
+            help="Адрес, к которому отправляются запросы",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=500,
+            help="Количество запросов в каждом режиме",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="Количество потоков, отправляющих запросы",
+        )
+
+    def handle(self, *args, **options):
+        if connections["default"].vendor != "postgresql":
+            raise CommandError("Команда работает только с PostgreSQL.")
+        self.handler = WSGIHandler()
+        self.environ = RequestFactory().get(
+            options["path"], HTTP_HOST="localhost"
+        ).environ
+        settings_dict = connections.settings["default"]
+        original = {
+            key: settings_dict[key]
+            for key in ("CONN_MAX_AGE", "CONN_HEALTH_CHECKS", "OPTIONS")
+        }
+        try:
+            for mode in options["modes"] or CONNECTION_MODES:
+                self.configure(mode)
+                self.run(options["concurrency"], options["concurrency"])
+                get_pool_stats(reset=True)
+                latencies = self.run(
+                    options["requests"], options["concurrency"]
+                )
+                self.report(mode, latencies)
+        finally:
+            self.reset_connections()
+            settings_dict.update(original)
+
+    def reset_connections(self):
+        connections.close_all()
+        if get_pool() is not None:
+            connections["default"].close_pool()
+
+    def configure(self, mode):
+        self.reset_connections()
+        connections.settings["default"].update(
+            get_connection_settings(mode, DB_CONN_MAX_AGE, DB_POOL_OPTIONS)
+        )
+
+    def send(self):
+        started = time.perf_counter()
+        response = self.handler(dict(self.environ), lambda *args: None)
+        b"".join(response)
+        response.close()
+        return (time.perf_counter() - started) * 1000
+
+    def run(self, total, concurrency):
+        latencies = []
+        lock = threading.Lock()
+
+        def work(count):
+            local = [self.send() for _ in range(count)]
+            connections.close_all()
+            with lock:
+                latencies.extend(local)
+
+        threads = [
+            threading.Thread(
+                target=work,
+                args=(
+                    total // concurrency + (index < total % concurrency),
+                ),
+            )
+            for index in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies
+
+    def report(self, mode, latencies):
+        line = (
+            f"{mode}: p50={percentile(latencies, 0.50):.1f} мс, "
+            f"p95={percentile(latencies, 0.95):.1f} мс, "
+            f"p99={percentile(latencies, 0.99):.1f} мс"
+        )
+        stats = get_pool_stats() if mode == "pool" else None
+        if stats:
+            line += (
+                f", ожидание пула: {stats['wait_ms']} мс, "
+                f"запросов в очереди: {stats['queued']}, "
+                f"таймаутов: {stats['timeouts']}"
+            )
+        self.stdout.write(line)
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from api.images import generate_variants, has_variants
+from api.signals import mark_avatar_variants, mark_recipe_variants
+from recipes.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Создаёт уменьшенные копии изображений рецептов и аватаров"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--overwrite",
+            action="store_true",
+            help="Пересоздать уже существующие копии",
+        )
+        parser.add_argument(
+            "--pending",
+            action="store_true",
+            help=(
+                "Обработать только изображения, копии которых ещё не "
+                "отмечены как готовые"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image="")
+        users = User.objects.exclude(avatar__isnull=True).exclude(avatar="")
+        if options["pending"]:
+            recipes = recipes.exclude(image_variants_source=F("image"))
+            users = users.exclude(avatar_variants_source=F("avatar"))
+        names = set(recipes.values_list("image", flat=True))
+        names.update(users.values_list("avatar", flat=True))
+        created = failed = 0
+        for name in sorted(names):
+            try:
+                created += generate_variants(name, options["overwrite"])
+            except Exception as err:
+                failed += 1
+                self.stderr.write(
+                    self.style.ERROR(f"Ошибка для {name}: {err}")
+                )
+                continue
+            if has_variants(name):
+                self.mark_ready(name)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Изображений: {len(names)}, создано копий: {created}, "
+                f"ошибок: {failed}"
+            )
+        )
+
+    def mark_ready(self, name):
+        for recipe_id in Recipe.objects.filter(image=name).values_list(
+            "id", flat=True
+        ):
+            mark_recipe_variants(recipe_id, name)
+        for user_id in User.objects.filter(avatar=name).values_list(
+            "id", flat=True
+        ):
+            mark_avatar_variants(user_id, name)
@@ -0,0 +1,423 @@
+import json
+import random
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from api.benchmark import read_request_totals, run_load, run_server
+from foodgram_back.settings import BASE_DIR
+from ingredients.catalog import ingredient_catalog
+from ingredients.models import Ingredient
+from recipes.cart_totals import rebuild_cart_totals
+from recipes.models import (
+    Favorite,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+)
+from users.models import Subscription, User
+
+BENCH_USER_PREFIX = "bench-user-"
+BENCH_IMAGE_NAME = "recipes/pics/bench.png"
+FLOWS = (
+    "browse_feed",
+    "filter_favorites",
+    "subscribe",
+    "toggle_cart",
+    "download_list",
+    "ingredient_autocomplete",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет базу тестовыми данными, нагружает основные сценарии API "
+        "на локально запущенном сервере и сохраняет результаты в JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            action="store_true",
+            help="Заполнить базу перед запуском, если данных ещё нет",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=200,
+            help="Количество тестовых пользователей",
+        )
+        parser.add_argument(
+            "--recipes",
+            type=int,
+            default=2000,
+            help="Количество тестовых рецептов",
+        )
+        parser.add_argument(
+            "--ingredients-per-recipe",
+            type=int,
+            default=8,
+            help="Количество ингредиентов в рецепте",
+        )
+        parser.add_argument(
+            "--flow",
+            action="append",
+            choices=FLOWS,
+            dest="flows",
+            help="Запускаемые сценарии, по умолчанию все",
+        )
+        parser.add_argument(
+            "--concurrency",
+            action="append",
+            type=int,
+            dest="concurrency_levels",
+            help="Уровни параллельности, по умолчанию 1 и 16",
+        )
+        parser.add_argument(
+            "--scenarios",
+            type=int,
+            default=200,
+            help="Количество повторов сценария на каждом уровне",
+        )
+        parser.add_argument(
+            "--deployment",
+            choices=("wsgi", "asgi"),
+            default="wsgi",
+            help="Способ запуска сервера",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=2,
+            help="Количество процессов gunicorn",
+        )
+        parser.add_argument(
+            "--port",
+            type=int,
+            default=8765,
+            help="Порт, на котором запускается сервер",
+        )
+        parser.add_argument(
+            "--random-seed",
+            type=int,
+            default=0,
+            help="Начальное значение генератора случайных чисел",
+        )
+        parser.add_argument(
+            "--output",
+            help="Файл, в который сохраняются результаты",
+        )
+        parser.add_argument(
+            "--compare",
+            help="Файл с предыдущими результатами для сравнения",
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["random_seed"])
+        if options["seed"]:
+            self.seed(
+                options["users"],
+                options["recipes"],
+                options["ingredients_per_recipe"],
+            )
+        users = list(
+            User.objects.filter(
+                username__startswith=BENCH_USER_PREFIX
+            ).order_by("pk")
+        )
+        if not users:
+            raise CommandError(
+                "Тестовых данных нет, запустите команду с --seed."
+            )
+        self.prepare_fixtures(users)
+        results = {}
+        with run_server(
+            options["deployment"],
+            options["port"],
+            options["workers"],
+            env={"METRICS_DIR": tempfile.mkdtemp(prefix="foodgram-bench-")},
+        ) as base_url:
+            for flow in options["flows"] or FLOWS:
+                results[flow] = {}
+                for concurrency in options["concurrency_levels"] or (1, 16):
+                    results[flow][str(concurrency)] = self.measure(
+                        base_url,
+                        getattr(self, f"build_{flow}"),
+                        options["scenarios"],
+                        concurrency,
+                    )
+                    self.report(flow, concurrency, results[flow])
+        report = {
+            "meta": self.get_meta(options),
+            "results": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(
+                    report, file, ensure_ascii=False, indent=2, sort_keys=True
+                )
+                file.write("\n")
+        if options["compare"]:
+            self.compare(options["compare"], results)
+
+    def measure(self, base_url, build, count, concurrency):
+        scenarios = [build(index) for index in range(count)]
+        run_load(base_url, scenarios[:concurrency], concurrency)
+        requests_before, queries_before = read_request_totals(base_url)
+        result = run_load(base_url, scenarios, concurrency)
+        requests_after, queries_after = read_request_totals(base_url)
+        result["queries_per_request"] = round(
+            (queries_after - queries_before)
+            / max(requests_after - requests_before, 1),
+            2,
+        )
+        return {
+            key: round(value, 2) if isinstance(value, float) else value
+            for key, value in result.items()
+        }
+
+    def report(self, flow, concurrency, results):
+        result = results[str(concurrency)]
+        self.stdout.write(
+            f"{flow} x{concurrency}: {result['throughput']:.1f} запр/с, "
+            f"p50={result['p50']:.1f} мс, p95={result['p95']:.1f} мс, "
+            f"p99={result['p99']:.1f} мс, "
+            f"запросов к БД: {result['queries_per_request']}, "
+            f"ошибок: {result['errors']}"
+        )
+
+    def compare(self, path, results):
+        with open(path, encoding="utf-8") as file:
+            previous = json.load(file)["results"]
+        for flow, levels in results.items():
+            for concurrency, result in levels.items():
+                before = previous.get(flow, {}).get(concurrency)
+                if before is None:
+                    continue
+                self.stdout.write(
+                    f"{flow} x{concurrency}: "
+                    f"запр/с {before['throughput']} -> "
+                    f"{result['throughput']}, "
+                    f"p95 {before['p95']} -> {result['p95']} мс, "
+                    f"запросов к БД {before['queries_per_request']} -> "
+                    f"{result['queries_per_request']}"
+                )
+
+    def get_meta(self, options):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "HEAD"],
+                cwd=BASE_DIR,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            "commit": commit,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "deployment": options["deployment"],
+            "workers": options["workers"],
+            "scenarios": options["scenarios"],
+            "users": User.objects.filter(
+                username__startswith=BENCH_USER_PREFIX
+            ).count(),
+            "recipes": Recipe.objects.count(),
+            "ingredients": Ingredient.objects.count(),
+        }
+
+    @transaction.atomic
+    def seed(self, users_count, recipes_count, ingredients_per_recipe):
+        if User.objects.filter(
+            username__startswith=BENCH_USER_PREFIX
+        ).exists():
+            self.stdout.write("Тестовые данные уже есть, заполнение пропущено")
+            return
+        if not default_storage.exists(BENCH_IMAGE_NAME):
+            buffer = BytesIO()
+            Image.new("RGB", (480, 480), "orange").save(buffer, "PNG")
+            default_storage.save(
+                BENCH_IMAGE_NAME, ContentFile(buffer.getvalue())
+            )
+        missing = ingredients_per_recipe * 10 - Ingredient.objects.count()
+        if missing > 0:
+            Ingredient.objects.bulk_create(
+                Ingredient(
+                    name=f"Тестовый ингредиент {index}",
+                    measurement_unit="г",
+                )
+                for index in range(missing)
+            )
+            ingredient_catalog.invalidate()
+        ingredient_ids = list(Ingredient.objects.values_list("id", flat=True))
+        password = make_password(None)
+        User.objects.bulk_create(
+            User(
+                username=f"{BENCH_USER_PREFIX}{index}",
+                email=f"{BENCH_USER_PREFIX}{index}@example.com",
+                first_name="Тест",
+                last_name=f"Пользователь {index}",
+                password=password,
+            )
+            for index in range(users_count)
+        )
+        users = list(
+            User.objects.filter(
+                username__startswith=BENCH_USER_PREFIX
+            ).order_by("pk")
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=self.random.choice(users),
+                name=f"Тестовый рецепт {index}",
+                text="Описание тестового рецепта. " * 10,
+                cooking_time=self.random.randint(5, 120),
+                image=BENCH_IMAGE_NAME,
+            )
+            for index in range(recipes_count)
+        )
+        recipe_ids = list(Recipe.objects.values_list("id", flat=True))
+        RecipeIngredient.objects.bulk_create(
+            (
+                RecipeIngredient(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=self.random.randint(1, 500),
+                )
+                for recipe_id in recipe_ids
+                for ingredient_id in self.random.sample(
+                    ingredient_ids,
+                    min(ingredients_per_recipe, len(ingredient_ids)),
+                )
+            ),
+            batch_size=1000,
+        )
+        self.seed_relations(users, recipe_ids)
+        rebuild_cart_totals()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Создано пользователей: {len(users)}, "
+                f"рецептов: {len(recipes)}"
+            )
+        )
+
+    def seed_relations(self, users, recipe_ids):
+        subscriptions, favorites, carts = [], [], []
+        for user in users:
+            for author in self.random.sample(users, min(10, len(users))):
+                if author.pk != user.pk:
+                    subscriptions.append(
+                        Subscription(subscriber=user, author=author)
+                    )
+            for recipe_id in self.random.sample(
+                recipe_ids, min(20, len(recipe_ids))
+            ):
+                favorites.append(Favorite(user=user, recipe_id=recipe_id))
+            for recipe_id in self.random.sample(
+                recipe_ids, min(5, len(recipe_ids))
+            ):
+                carts.append(ShoppingCart(user=user, recipe_id=recipe_id))
+        Subscription.objects.bulk_create(subscriptions, batch_size=1000)
+        Favorite.objects.bulk_create(favorites, batch_size=1000)
+        ShoppingCart.objects.bulk_create(carts, batch_size=1000)
+
+    def prepare_fixtures(self, users):
+        self.headers = [
+            {"Authorization": f"Token {token.key}"}
+            for token in (
+                Token.objects.get_or_create(user=user)[0] for user in users
+            )
+        ]
+        self.user_ids = [user.pk for user in users]
+        self.recipe_ids = list(
+            Recipe.objects.values_list("id", flat=True)[:1000]
+        )
+        self.pages = max(1, len(self.recipe_ids) // 6)
+        self.prefixes = sorted(
+            {
+                name[:2]
+                for name in Ingredient.objects.values_list(
+                    "name", flat=True
+                )[:1000]
+            }
+        )
+
+    def pick_author(self, index):
+        user_index = index % len(self.user_ids)
+        author_index = (user_index + 1 + index // len(self.user_ids)) % len(
+            self.user_ids
+        )
+        if author_index == user_index:
+            author_index = (author_index + 1) % len(self.user_ids)
+        return self.headers[user_index], self.user_ids[author_index]
+
+    def build_browse_feed(self, index):
+        page = self.random.randint(1, min(self.pages, 20))
+        return [
+            (
+                "GET",
+                f"/api/recipes/?page={page}&limit=6",
+                self.headers[index % len(self.headers)],
+                None,
+            )
+        ]
+
+    def build_filter_favorites(self, index):
+        return [
+            (
+                "GET",
+                "/api/recipes/?is_favorited=1&limit=6",
+                self.headers[index % len(self.headers)],
+                None,
+            )
+        ]
+
+    def build_subscribe(self, index):
+        headers, author_id = self.pick_author(index)
+        path = f"/api/users/{author_id}/subscribe/"
+        return [
+            ("POST", path, headers, None),
+            ("DELETE", path, headers, None),
+        ]
+
+    def build_toggle_cart(self, index):
+        headers = self.headers[index % len(self.headers)]
+        recipe_id = self.recipe_ids[
+            (index // len(self.headers)) % len(self.recipe_ids)
+        ]
+        path = f"/api/recipes/{recipe_id}/shopping_cart/"
+        return [
+            ("POST", path, headers, None),
+            ("DELETE", path, headers, None),
+        ]
+
+    def build_download_list(self, index):
+        return [
+            (
+                "GET",
+                "/api/recipes/download_shopping_cart/",
+                self.headers[index % len(self.headers)],
+                None,
+            )
+        ]
+
+    def build_ingredient_autocomplete(self, index):
+        prefix = self.random.choice(self.prefixes) if self.prefixes else ""
+        return [
+            (
+                "GET",
+                f"/api/ingredients/?name={prefix}",
+                self.headers[index % len(self.headers)],
+                None,
+            )
+        ]
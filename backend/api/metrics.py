@@ -0,0 +1,204 @@
+import json
+import os
+import time
+from bisect import bisect_left
+from copy import deepcopy
+from contextvars import ContextVar
+from pathlib import Path
+from threading import Lock, Thread
+
+from foodgram_back.db_pool import get_pool_stats
+from foodgram_back.settings import (
+    METRICS_DIR,
+    METRICS_FLUSH_INTERVAL,
+    METRICS_LATENCY_BUCKETS,
+)
+
+current_queries = ContextVar("current_queries", default=None)
+
+POOL_GAUGES = ("size", "available", "max_size", "waiting")
+POOL_COUNTERS = ("requests", "queued", "wait_ms", "timeouts")
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    stats = current_queries.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.duration += time.perf_counter() - started
+
+
+def install_query_recorder(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def empty_view_metrics():
+    return {
+        "buckets": [0] * len(METRICS_LATENCY_BUCKETS),
+        "count": 0,
+        "duration": 0.0,
+        "queries": 0,
+        "query_duration": 0.0,
+        "response_bytes": 0,
+    }
+
+
+class RequestMetrics:
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.lock = Lock()
+        self.views = {}
+        self.dirty = False
+        self.flusher_pid = None
+
+    @property
+    def path(self):
+        return self.directory / f"worker-{os.getpid()}.json"
+
+    def observe(self, labels, duration, queries, response_bytes):
+        key = "\t".join(labels)
+        with self.lock:
+            metrics = self.views.setdefault(key, empty_view_metrics())
+            bucket = bisect_left(METRICS_LATENCY_BUCKETS, duration)
+            if bucket < len(METRICS_LATENCY_BUCKETS):
+                metrics["buckets"][bucket] += 1
+            metrics["count"] += 1
+            metrics["duration"] += duration
+            metrics["queries"] += queries.count
+            metrics["query_duration"] += queries.duration
+            metrics["response_bytes"] += response_bytes
+            self.dirty = True
+            if self.flusher_pid != os.getpid():
+                # Started lazily: threads do not survive the worker fork.
+                self.flusher_pid = os.getpid()
+                Thread(target=self.run_flusher, daemon=True).start()
+
+    def run_flusher(self):
+        while True:
+            time.sleep(METRICS_FLUSH_INTERVAL)
+            self.flush()
+
+    def snapshot(self):
+        with self.lock:
+            views = deepcopy(self.views)
+        return {"views": views, "pool": get_pool_stats() or {}}
+
+    def flush(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+            payload = json.dumps(
+                {"views": self.views, "pool": get_pool_stats() or {}}
+            )
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_suffix(".tmp")
+        temporary.write_text(payload)
+        os.replace(temporary, self.path)
+
+    def iter_worker_snapshots(self):
+        yield os.getpid(), self.snapshot()
+        for path in self.directory.glob("worker-*.json"):
+            pid = int(path.stem.split("-")[1])
+            if pid == os.getpid():
+                continue
+            try:
+                yield pid, json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+
+    def collect(self):
+        views = {}
+        pool = dict.fromkeys(POOL_GAUGES + POOL_COUNTERS, 0)
+        for pid, snapshot in self.iter_worker_snapshots():
+            for key, metrics in snapshot["views"].items():
+                total = views.setdefault(key, empty_view_metrics())
+                for name, value in metrics.items():
+                    if name == "buckets":
+                        total[name] = [
+                            left + right
+                            for left, right in zip(total[name], value)
+                        ]
+                    else:
+                        total[name] += value
+            alive = is_alive(pid)
+            for name, value in snapshot["pool"].items():
+                if name in POOL_COUNTERS or (name in POOL_GAUGES and alive):
+                    pool[name] += value
+        return views, pool
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def format_labels(labels):
+    view, method, status = labels
+    return f'view="{view}",method="{method}",status="{status}"'
+
+
+def render_prometheus(views, pool):
+    lines = [
+        "# HELP foodgram_request_duration_seconds Request latency.",
+        "# TYPE foodgram_request_duration_seconds histogram",
+    ]
+    for key, metrics in sorted(views.items()):
+        labels = format_labels(key.split("\t"))
+        cumulative = 0
+        for bound, count in zip(METRICS_LATENCY_BUCKETS, metrics["buckets"]):
+            cumulative += count
+            lines.append(
+                f"foodgram_request_duration_seconds_bucket"
+                f'{{{labels},le="{bound}"}} {cumulative}'
+            )
+        lines += [
+            f"foodgram_request_duration_seconds_bucket"
+            f'{{{labels},le="+Inf"}} {metrics["count"]}',
+            f"foodgram_request_duration_seconds_sum{{{labels}}} "
+            f"{metrics['duration']}",
+            f"foodgram_request_duration_seconds_count{{{labels}}} "
+            f"{metrics['count']}",
+        ]
+    for name, field, description in (
+        ("sql_queries_total", "queries", "SQL queries executed."),
+        ("sql_duration_seconds_total", "query_duration", "Time in SQL."),
+        ("response_bytes_total", "response_bytes", "Response body size."),
+    ):
+        lines += [
+            f"# HELP foodgram_{name} {description}",
+            f"# TYPE foodgram_{name} counter",
+        ]
+        for key, metrics in sorted(views.items()):
+            labels = format_labels(key.split("\t"))
+            lines.append(f"foodgram_{name}{{{labels}}} {metrics[field]}")
+    for name in POOL_GAUGES:
+        lines += [
+            f"# TYPE foodgram_db_pool_{name} gauge",
+            f"foodgram_db_pool_{name} {pool[name]}",
+        ]
+    for name in POOL_COUNTERS:
+        lines += [
+            f"# TYPE foodgram_db_pool_{name}_total counter",
+            f"foodgram_db_pool_{name}_total {pool[name]}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics(METRICS_DIR)
@@ -0,0 +1,84 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from api.metrics import QueryStats, current_queries, request_metrics
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        queries, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_queries.reset(token)
+        return self.finish(request, response, queries, started)
+
+    async def __acall__(self, request):
+        queries, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_queries.reset(token)
+        return self.finish(request, response, queries, started)
+
+    def start(self):
+        queries = QueryStats()
+        return queries, current_queries.set(queries), time.perf_counter()
+
+    def get_labels(self, request, response):
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else "unmatched"
+        return view, request.method, str(response.status_code)
+
+    def finish(self, request, response, queries, started):
+        labels = self.get_labels(request, response)
+        if not response.streaming:
+            request_metrics.observe(
+                labels,
+                time.perf_counter() - started,
+                queries,
+                len(response.content),
+            )
+            return response
+        count_streamed = (
+            self.acount_streamed if response.is_async else self.count_streamed
+        )
+        response.streaming_content = count_streamed(
+            response.streaming_content, labels, queries, started
+        )
+        return response
+
+    def count_streamed(self, content, labels, queries, started):
+        size = 0
+        current_queries.set(queries)
+        try:
+            for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            request_metrics.observe(
+                labels, time.perf_counter() - started, queries, size
+            )
+
+    async def acount_streamed(self, content, labels, queries, started):
+        size = 0
+        current_queries.set(queries)
+        try:
+            async for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            request_metrics.observe(
+                labels, time.perf_counter() - started, queries, size
+            )
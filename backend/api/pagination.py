@@ -1,8 +1,210 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+from functools import partial
 
-from foodgram_back.settings import PAGE_SIZE
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.paginator import (
+    EmptyPage,
+    InvalidPage,
+    Page,
+    PageNotAnInteger,
+    Paginator,
+)
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from foodgram_back.settings import (
+    PAGE_SIZE,
+    PAGINATION_COUNT_CACHE_TIMEOUT,
+    PAGINATION_COUNT_ESTIMATE_THRESHOLD,
+)
+
+
+class CountingPage(Page):
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class CountingPaginator(Paginator):
+    def __init__(self, *args, count_cache_key=None, **kwargs):
+        self.count_cache_key = count_cache_key
+        super().__init__(*args, **kwargs)
+
+    def estimate_count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if (
+            PAGINATION_COUNT_ESTIMATE_THRESHOLD is None
+            or connection.vendor != "postgresql"
+        ):
+            return None
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        estimate = int(plan[0]["Plan"]["Plan Rows"])
+        if estimate < PAGINATION_COUNT_ESTIMATE_THRESHOLD:
+            return None
+        return estimate
+
+    @cached_property
+    def count(self):
+        if self.count_cache_key is not None:
+            count = cache.get(self.count_cache_key)
+            if count is not None:
+                return count
+        count = self.estimate_count()
+        if count is None:
+            count = super().count
+        if self.count_cache_key is not None:
+            cache.set(
+                self.count_cache_key, count, PAGINATION_COUNT_CACHE_TIMEOUT
+            )
+        return count
+
+    def validate_number(self, number):
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages["invalid_page"])
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        return number
+
+    def get_page_bounds(self, number):
+        bottom = (number - 1) * self.per_page
+        return bottom, bottom + self.per_page + 1
+
+    def build_page(self, rows, number):
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+        return CountingPage(
+            rows[: self.per_page],
+            number,
+            self,
+            has_next=len(rows) > self.per_page,
+        )
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom, top = self.get_page_bounds(number)
+        return self.build_page(list(self.object_list[bottom:top]), number)
+
+    async def apage(self, number):
+        number = self.validate_number(number)
+        bottom, top = self.get_page_bounds(number)
+        return self.build_page(
+            [obj async for obj in self.object_list[bottom:top]], number
+        )
+
+    async def acount(self):
+        if self.count_cache_key is not None:
+            count = await cache.aget(self.count_cache_key)
+            if count is not None:
+                return count
+        count = await sync_to_async(self.estimate_count)()
+        if count is None:
+            count = await self.object_list.acount()
+        if self.count_cache_key is not None:
+            await cache.aset(
+                self.count_cache_key, count, PAGINATION_COUNT_CACHE_TIMEOUT
+            )
+        return count
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = "limit"
     page_size = PAGE_SIZE
+
+    def get_count_cache_key(self, request):
+        if not PAGINATION_COUNT_CACHE_TIMEOUT:
+            return None
+        params = sorted(
+            (key, value)
+            for key, value in request.query_params.lists()
+            if key not in (self.page_query_param, self.page_size_query_param)
+        )
+        user_id = request.user.pk if request.user.is_authenticated else None
+        digest = hashlib.md5(
+            repr((request.path, user_id, params)).encode()
+        ).hexdigest()
+        return f"pagination:count:{digest}"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.django_paginator_class = partial(
+            CountingPaginator,
+            count_cache_key=self.get_count_cache_key(request),
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = CountingPaginator(
+            queryset,
+            page_size,
+            count_cache_key=self.get_count_cache_key(request),
+        )
+        paginator.count = await paginator.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = await paginator.apage(page_number)
+        except InvalidPage as exc:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=page_number, message=str(exc)
+                )
+            )
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+
+class RecipeCursorPagination(CursorPagination):
+    page_size_query_param = "limit"
+    page_size = PAGE_SIZE
+    ordering = ("-created_at", "-id")
+
+
+class RecipePagination(CustomPagination):
+    mode_query_param = "pagination"
+    cursor_mode = "cursor"
+    cursor_paginator = None
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param)
+            == self.cursor_mode
+            or RecipeCursorPagination.cursor_query_param
+            in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.cursor_paginator = RecipeCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            return await sync_to_async(self.paginate_queryset)(
+                queryset, request, view
+            )
+        return await super().apaginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
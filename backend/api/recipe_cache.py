@@ -0,0 +1,108 @@
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from foodgram_back.settings import RECIPE_CACHE_TIMEOUT
+from ingredients.catalog import CATALOG_VERSION_KEY
+
+RECIPE_VERSION_KEY = "recipes:version:{}"
+AUTHOR_VERSION_KEY = "recipes:author_version:{}"
+REPRESENTATION_KEY = "recipes:representation:{}:{}:{}:{}:{}:{}"
+# Only the columns the shared representation is built from, so that saves
+# such as an author's last_login keep the cached copies.
+RECIPE_STATE_FIELDS = (
+    "name",
+    "image",
+    "image_variants_source",
+    "text",
+    "cooking_time",
+)
+AUTHOR_STATE_FIELDS = (
+    "email",
+    "username",
+    "first_name",
+    "last_name",
+    "avatar",
+    "avatar_variants_source",
+)
+
+
+def get_versions(keys):
+    versions = cache.get_many(keys)
+    for key in set(keys) - versions.keys():
+        cache.add(key, uuid.uuid4().hex, None)
+        versions[key] = cache.get(key)
+    return versions
+
+
+def get_instance_state(instance, field_names):
+    deferred = instance.get_deferred_fields()
+    return tuple(
+        str(instance._meta.get_field(name).value_from_object(instance))
+        for name in field_names
+        if name not in deferred
+    )
+
+
+def get_rows_digest(recipe):
+    # Rows are loaded before the versions are read, so a row read before a
+    # write commits must not be stored under the version bumped after it.
+    state = (
+        get_instance_state(recipe, RECIPE_STATE_FIELDS),
+        get_instance_state(recipe.author, AUTHOR_STATE_FIELDS),
+    )
+    return hashlib.md5(repr(state).encode()).hexdigest()
+
+
+def get_representation_keys(recipes, request):
+    origin = request.build_absolute_uri("/") if request else ""
+    version_keys = [CATALOG_VERSION_KEY]
+    for recipe in recipes:
+        version_keys.append(RECIPE_VERSION_KEY.format(recipe.pk))
+        version_keys.append(AUTHOR_VERSION_KEY.format(recipe.author_id))
+    versions = get_versions(version_keys)
+    return {
+        recipe.pk: REPRESENTATION_KEY.format(
+            recipe.pk,
+            versions[RECIPE_VERSION_KEY.format(recipe.pk)],
+            versions[AUTHOR_VERSION_KEY.format(recipe.author_id)],
+            versions[CATALOG_VERSION_KEY],
+            get_rows_digest(recipe),
+            origin,
+        )
+        for recipe in recipes
+    }
+
+
+def get_representations(keys):
+    cached = cache.get_many(list(keys.values()))
+    return {
+        recipe_id: cached[key]
+        for recipe_id, key in keys.items()
+        if key in cached
+    }
+
+
+def set_representations(keys, representations):
+    if RECIPE_CACHE_TIMEOUT and representations:
+        cache.set_many(
+            {
+                keys[recipe_id]: representation
+                for recipe_id, representation in representations.items()
+            },
+            RECIPE_CACHE_TIMEOUT,
+        )
+
+
+def bump_version(key):
+    transaction.on_commit(lambda: cache.set(key, uuid.uuid4().hex, None))
+
+
+def invalidate_recipe(recipe_id):
+    bump_version(RECIPE_VERSION_KEY.format(recipe_id))
+
+
+def invalidate_author(author_id):
+    bump_version(AUTHOR_VERSION_KEY.format(author_id))
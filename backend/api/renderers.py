@@ -0,0 +1,23 @@
+from rest_framework.renderers import BaseRenderer
+
+
+class PlainTextRenderer(BaseRenderer):
+    media_type = "text/plain"
+    format = "txt"
+    charset = "utf-8"
+    delimiter = ": "
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if isinstance(data, dict):
+            data = "\n".join(
+                f"{key}{self.delimiter}{value}" for key, value in data.items()
+            )
+        return str(data).encode(self.charset)
+
+
+class CSVRenderer(PlainTextRenderer):
+    media_type = "text/csv"
+    format = "csv"
+    delimiter = ","
@@ -1,23 +1,82 @@
 import base64
+import binascii
 import uuid
 
 from rest_framework import serializers
 from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+
+from foodgram_back.settings import (
+    FILE_UPLOAD_MAX_MEMORY_SIZE,
+    MAX_IMAGE_UPLOAD_SIZE,
+)
+
+BASE64_HEADER_SEPARATOR = ";base64,"
+# Must be a multiple of 4 so that every chunk decodes on its own
+BASE64_DECODE_CHUNK_SIZE = 64 * 1024
+
+
+class DecodedImageFile(TemporaryUploadedFile):
+    def __del__(self):
+        # Storage moves the temporary file into place on save, so close it
+        # here where the missing file is handled instead of in tempfile.
+        self.close()
 
 
 class Base64EncodedImageField(serializers.ImageField):
+    default_error_messages = {
+        "invalid_base64": "Некорректное изображение в формате base64.",
+        "max_size": "Размер изображения не может превышать {max_size} байт.",
+    }
+
     def __init__(
-        self, *args, file_prefix="file", max_filename_length=None, **kwargs
+        self,
+        *args,
+        file_prefix="file",
+        max_filename_length=None,
+        max_size=MAX_IMAGE_UPLOAD_SIZE,
+        **kwargs,
     ):
         self.file_prefix = file_prefix
         self.max_filename_length = max_filename_length
+        self.max_size = max_size
         super().__init__(*args, **kwargs)
 
     def to_internal_value(self, value):
         if isinstance(value, str) and value.startswith("data:image"):
-            header, encoded_data = value.split(";base64,")
-            extension = header.split("/")[-1]
-            unique_filename = f"{self.file_prefix}_{uuid.uuid4()}.{extension}"
-            decoded_file = base64.b64decode(encoded_data)
-            value = ContentFile(decoded_file, name=unique_filename)
+            value = self.decode_base64(value)
+        elif getattr(value, "size", 0) > self.max_size:
+            self.fail("max_size", max_size=self.max_size)
         return super().to_internal_value(value)
+
+    def decode_base64(self, value):
+        separator = value.find(BASE64_HEADER_SEPARATOR)
+        if separator == -1:
+            self.fail("invalid_base64")
+        extension = value[:separator].split("/")[-1]
+        unique_filename = f"{self.file_prefix}_{uuid.uuid4()}.{extension}"
+        start = separator + len(BASE64_HEADER_SEPARATOR)
+        padding = 2 if value.endswith("==") else int(value.endswith("="))
+        size = (len(value) - start) * 3 // 4 - padding
+        if size > self.max_size:
+            self.fail("max_size", max_size=self.max_size)
+        try:
+            if size <= FILE_UPLOAD_MAX_MEMORY_SIZE:
+                return ContentFile(
+                    base64.b64decode(value[start:], validate=True),
+                    name=unique_filename,
+                )
+            decoded_file = DecodedImageFile(
+                unique_filename, f"image/{extension}", size, None
+            )
+            for offset in range(start, len(value), BASE64_DECODE_CHUNK_SIZE):
+                decoded_file.write(
+                    base64.b64decode(
+                        value[offset:offset + BASE64_DECODE_CHUNK_SIZE],
+                        validate=True,
+                    )
+                )
+        except binascii.Error:
+            self.fail("invalid_base64")
+        decoded_file.seek(0)
+        return decoded_file
@@ -1,8 +1,25 @@
+import json
+from collections import Counter
+from collections.abc import Mapping
+
+from django.db import transaction
+from django.db.models import (
+    Manager,
+    aprefetch_related_objects,
+    prefetch_related_objects,
+)
 from rest_framework import serializers
 
 from ingredients.models import Ingredient
+from recipes.cart_totals import sync_recipe_in_cart_totals
 from recipes.models import RecipeIngredient, Recipe, ShoppingCart, Favorite
 
+from api.images import get_variant_urls
+from api.recipe_cache import (
+    get_representation_keys,
+    get_representations,
+    set_representations,
+)
 from api.serializers.general import Base64EncodedImageField
 from api.serializers.users import (
     UserDetailSerializer,
@@ -12,7 +29,8 @@ from api.serializers.users import (
 
 from foodgram_back.settings import (
     MIN_COOKING_TIME, MAX_COOKING_TIME,
-    MAX_INGREDIENT_AMOUNT, MIN_INGREDIENT_AMOUNT
+    MAX_INGREDIENT_AMOUNT, MIN_INGREDIENT_AMOUNT,
+    RECIPE_CACHE_TIMEOUT, MAX_BULK_RECIPES,
 )
 
 
@@ -28,10 +46,35 @@ class RecipeIngredientDetailSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "measurement_unit", "amount")
 
 
+class RecipeIngredientCreateListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        ingredients = Ingredient.objects.in_bulk(
+            {item["ingredient"] for item in items}
+        )
+        errors = []
+        for item in items:
+            ingredient = ingredients.get(item["ingredient"])
+            if ingredient is None:
+                errors.append(
+                    {
+                        "id": [
+                            serializers.PrimaryKeyRelatedField
+                            .default_error_messages["does_not_exist"]
+                            .format(pk_value=item["ingredient"])
+                        ]
+                    }
+                )
+                continue
+            errors.append({})
+            item["ingredient"] = ingredient
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
+
 class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(), source="ingredient"
-    )
+    id = serializers.IntegerField(source="ingredient")
     amount = serializers.IntegerField(
         min_value=MIN_INGREDIENT_AMOUNT, max_value=MAX_INGREDIENT_AMOUNT,
         error_messages={
@@ -45,6 +88,15 @@ class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = RecipeIngredient
         fields = ("id", "amount")
+        list_serializer_class = RecipeIngredientCreateListSerializer
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        recipes = list(data.all() if isinstance(data, Manager) else data)
+        if getattr(self.child, "_shared_representations", None) is None:
+            self.child.load_shared_representations(recipes)
+        return super().to_representation(recipes)
 
 
 class RecipeDetailSerializer(serializers.ModelSerializer):
@@ -53,6 +105,7 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
         source="recipe_ingredients", many=True, read_only=True
     )
     image = Base64EncodedImageField(required=True, allow_null=False)
+    image_variants = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
@@ -66,11 +119,82 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_variants",
             "text",
             "cooking_time",
         )
+        list_serializer_class = RecipeListSerializer
+
+    def load_shared_representations(self, recipes):
+        missing = self.get_missing_representations(recipes)
+        prefetch_related_objects(missing, "recipe_ingredients__ingredient")
+        self.compute_shared_representations(missing)
+
+    async def aload_shared_representations(self, recipes):
+        missing = self.get_missing_representations(recipes)
+        await aprefetch_related_objects(
+            missing, "recipe_ingredients__ingredient"
+        )
+        self.compute_shared_representations(missing)
+
+    def get_missing_representations(self, recipes):
+        self._shared_representations = {}
+        self._representation_keys = None
+        if not RECIPE_CACHE_TIMEOUT:
+            return recipes
+        self._representation_keys = get_representation_keys(
+            recipes, self.context.get("request")
+        )
+        self._shared_representations = get_representations(
+            self._representation_keys
+        )
+        return [
+            recipe
+            for recipe in recipes
+            if recipe.pk not in self._shared_representations
+        ]
+
+    def compute_shared_representations(self, missing):
+        if self._representation_keys is None:
+            return
+        computed = {
+            recipe.pk: super(RecipeDetailSerializer, self).to_representation(
+                recipe
+            )
+            for recipe in missing
+        }
+        set_representations(self._representation_keys, computed)
+        self._shared_representations.update(computed)
+
+    def to_representation(self, instance):
+        shared_representations = getattr(
+            self, "_shared_representations", None
+        )
+        if shared_representations is None:
+            self.load_shared_representations([instance])
+            shared_representations = self._shared_representations
+        data = shared_representations.get(instance.pk)
+        if data is None:
+            return super().to_representation(instance)
+        data = {**data, "author": {**data["author"]}}
+        data["author"]["is_subscribed"] = self.fields[
+            "author"
+        ].get_is_subscribed(instance.author)
+        data["is_favorited"] = self.get_is_favorited(instance)
+        data["is_in_shopping_cart"] = self.get_is_in_shopping_cart(instance)
+        return data
+
+    def get_image_variants(self, recipe_obj):
+        return get_variant_urls(
+            recipe_obj.image,
+            recipe_obj.image_variants_source,
+            self.context.get("request"),
+        )
 
-    def _relation_exists(self, recipe_obj, relation_model):
+    def _relation_exists(self, recipe_obj, flag_name, relation_model):
+        precomputed = getattr(recipe_obj, flag_name, None)
+        if precomputed is not None:
+            return precomputed
         request = self.context.get("request")
         if (
             not request
@@ -83,10 +207,12 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
         ).exists()
 
     def get_is_favorited(self, recipe_obj):
-        return self._relation_exists(recipe_obj, Favorite)
+        return self._relation_exists(recipe_obj, "is_favorited", Favorite)
 
     def get_is_in_shopping_cart(self, recipe_obj):
-        return self._relation_exists(recipe_obj, ShoppingCart)
+        return self._relation_exists(
+            recipe_obj, "is_in_shopping_cart", ShoppingCart
+        )
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
@@ -121,6 +247,21 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ("author",)
 
+    def to_internal_value(self, data):
+        ingredients = (
+            data.get("ingredients") if isinstance(data, Mapping) else None
+        )
+        if isinstance(ingredients, str):
+            try:
+                ingredients = json.loads(ingredients)
+            except ValueError:
+                raise serializers.ValidationError(
+                    {"ingredients": ["Ожидался список ингредиентов в JSON."]}
+                )
+            data = dict(data.items())
+            data["ingredients"] = ingredients
+        return super().to_internal_value(data)
+
     def validate(self, data):
         ingredient_list = data.get("recipe_ingredients", [])
         if not ingredient_list:
@@ -162,14 +303,52 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 
         recipe = Recipe.objects.create(author=user, **validated_data)
         self.create_ingredients(recipe, ingredient_data)
+        recipe.is_favorited = False
+        recipe.is_in_shopping_cart = False
         return recipe
 
+    def update_ingredients(self, recipe, ingredient_data):
+        amounts = {
+            item["ingredient"].id: item["amount"] for item in ingredient_data
+        }
+        previous_amounts = Counter()
+        existing = {}
+        to_delete = []
+        for row in recipe.recipe_ingredients.all():
+            previous_amounts[row.ingredient_id] += row.amount
+            if (
+                row.ingredient_id in existing
+                or row.ingredient_id not in amounts
+            ):
+                to_delete.append(row.pk)
+            else:
+                existing[row.ingredient_id] = row
+        if not to_delete and previous_amounts == amounts:
+            return
+        to_update = []
+        for ingredient_id, row in existing.items():
+            if row.amount != amounts[ingredient_id]:
+                row.amount = amounts[ingredient_id]
+                to_update.append(row)
+        if to_delete:
+            RecipeIngredient.objects.filter(pk__in=to_delete).delete()
+        RecipeIngredient.objects.bulk_update(to_update, ["amount"])
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
+            )
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in existing
+        )
+        sync_recipe_in_cart_totals(
+            recipe.id, previous_amounts, Counter(amounts)
+        )
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredient_data = validated_data.pop("recipe_ingredients")
-        instance.recipe_ingredients.all().delete()
-        self.create_ingredients(instance, ingredient_data)
-        updated_recipe = super().update(instance, validated_data)
-        return updated_recipe
+        self.update_ingredients(instance, ingredient_data)
+        return super().update(instance, validated_data)
 
     def to_representation(self, instance):
         return RecipeDetailSerializer(
@@ -177,17 +356,22 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         ).data
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BULK_RECIPES,
+    )
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
+
+
 class CartSerializer(serializers.ModelSerializer):
     class Meta:
         model = ShoppingCart
         fields = ("user", "recipe")
-
-    def validate(self, attrs):
-        if ShoppingCart.objects.filter(**attrs).exists():
-            raise serializers.ValidationError(
-                "Этот рецепт уже добавлен в корзину."
-            )
-        return attrs
+        validators = []
 
     def to_representation(self, instance):
         return RecipeMiniDisplaySerializer(
@@ -199,13 +383,9 @@ class FavoriteRecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Favorite
         fields = ("user", "recipe")
-
-    def validate(self, attrs):
-        if Favorite.objects.filter(**attrs).exists():
-            raise serializers.ValidationError(
-                "Этот рецепт уже добавлен в избранное."
-            )
-        return attrs
+        validators = []
 
     def to_representation(self, instance):
-        return RecipeMiniDisplaySerializer(instance.recipe).data
+        return RecipeMiniDisplaySerializer(
+            instance.recipe, context={"request": self.context.get("request")}
+        ).data
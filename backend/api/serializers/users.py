@@ -1,8 +1,9 @@
 from rest_framework import serializers
 
-from users.models import User, Subscription
+from users.models import User
 from recipes.models import Recipe
 
+from api.images import get_variant_urls
 from api.serializers.general import Base64EncodedImageField
 
 
@@ -18,6 +19,7 @@ class UserDetailSerializer(serializers.ModelSerializer):
     avatar = Base64EncodedImageField(
         allow_null=True, required=False, file_prefix="avatar"
     )
+    avatar_variants = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -29,13 +31,32 @@ class UserDetailSerializer(serializers.ModelSerializer):
             "first_name",
             "last_name",
             "avatar",
+            "avatar_variants",
             "is_subscribed",
         ]
 
+    def get_avatar_variants(self, user_obj):
+        return get_variant_urls(
+            user_obj.avatar,
+            user_obj.avatar_variants_source,
+            self.context.get("request"),
+        )
+
+    def _get_subscribed_author_ids(self, request_user):
+        author_ids = self.context.get("subscribed_author_ids")
+        if author_ids is None:
+            author_ids = set(
+                request_user.subscriptions.values_list("author_id", flat=True)
+            )
+            self.context["subscribed_author_ids"] = author_ids
+        return author_ids
+
     def get_is_subscribed(self, user_obj):
-        request_user = self.context["request"].user
-        if request_user.is_authenticated:
-            return user_obj.followers.filter(subscriber=request_user).exists()
+        request = self.context.get("request")
+        if request and request.user.is_authenticated:
+            return user_obj.id in self._get_subscribed_author_ids(
+                request.user
+            )
         return False
 
 
@@ -57,9 +78,17 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return User.objects.create_user(**validated_data)
 
 
+def get_recipes_limit(request):
+    limit = request.GET.get("recipes_limit") if request else None
+    if limit and limit.isdigit():
+        return int(limit)
+    return None
+
+
 class SubscriptionDetailSerializer(serializers.ModelSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(default=0)
+    recipes_count = serializers.SerializerMethodField()
+    avatar_variants = serializers.SerializerMethodField()
     is_subscribed = serializers.BooleanField(default=True)
 
     class Meta:
@@ -73,56 +102,39 @@ class SubscriptionDetailSerializer(serializers.ModelSerializer):
             "recipes",
             "recipes_count",
             "avatar",
+            "avatar_variants",
             "is_subscribed",
         )
 
+    def get_avatar_variants(self, author):
+        return get_variant_urls(
+            author.avatar,
+            author.avatar_variants_source,
+            self.context.get("request"),
+        )
+
     def get_recipes(self, author):
         request = self.context.get("request")
-        author_recipes = author.recipes.all()
-        limit = request.GET.get("recipes_limit")
-        if limit and limit.isdigit():
-            author_recipes = author_recipes[: int(limit)]
+        author_recipes = getattr(author, "limited_recipes", None)
+        if author_recipes is None:
+            author_recipes = author.recipes.all()
+            limit = get_recipes_limit(request)
+            if limit is not None:
+                author_recipes = author_recipes[:limit]
         return RecipeMiniDisplaySerializer(
             author_recipes, many=True, context={"request": request}
         ).data
 
     def get_recipes_count(self, obj):
+        recipes_count = getattr(obj, "recipes_count", None)
+        if recipes_count is not None:
+            return recipes_count
         return obj.recipes.count()
 
 
-class SubscriptionCreateSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Subscription
-        fields = ("subscriber", "author")
-
-    def validate_author(self, author):
-        current_user = self.context["request"].user
-        if current_user == author:
-            raise serializers.ValidationError(
-                "Нельзя подписаться на самого себя."
-            )
-        if current_user.subscriptions.filter(author=author).exists():
-            raise serializers.ValidationError(
-                "Вы уже подписаны на этого автора."
-            )
-        return author
-
-    def to_representation(self, instance):
-        request = self.context.get("request")
-        if isinstance(instance, dict):
-            author = instance.get("author")
-        else:
-            author = instance.author
-        return SubscriptionDetailSerializer(
-            author, context={"request": request}
-        ).data
-
-    def create(self, validated_data):
-        return Subscription.objects.create(**validated_data)
-
-
 class RecipeMiniDisplaySerializer(serializers.ModelSerializer):
     image = Base64EncodedImageField(required=True, allow_null=False)
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -130,5 +142,13 @@ class RecipeMiniDisplaySerializer(serializers.ModelSerializer):
             "id",
             "name",
             "image",
+            "image_variants",
             "cooking_time",
         )
+
+    def get_image_variants(self, recipe_obj):
+        return get_variant_urls(
+            recipe_obj.image,
+            recipe_obj.image_variants_source,
+            self.context.get("request"),
+        )
@@ -0,0 +1,65 @@
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+SHOPPING_LIST_FILENAME = "shopping_list"
+SHOPPING_LIST_CHUNK_SIZE = 500
+
+
+class EchoBuffer:
+    def write(self, value):
+        return value
+
+
+def iter_txt(ingredients):
+    for item in ingredients:
+        yield (
+            f'{item["ingredient__name"]} - {item["total_amount"]} '
+            f'{item["ingredient__measurement_unit"]}\n'
+        )
+
+
+def iter_csv(ingredients):
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(("name", "amount", "measurement_unit"))
+    for item in ingredients:
+        yield writer.writerow(
+            (
+                item["ingredient__name"],
+                item["total_amount"],
+                item["ingredient__measurement_unit"],
+            )
+        )
+
+
+def iter_json(ingredients):
+    separator = ""
+    yield "["
+    for item in ingredients:
+        yield separator + json.dumps(
+            {
+                "name": item["ingredient__name"],
+                "amount": item["total_amount"],
+                "measurement_unit": item["ingredient__measurement_unit"],
+            },
+            ensure_ascii=False,
+        )
+        separator = ","
+    yield "]"
+
+
+async def aiter_in_chunks(iterator, size=SHOPPING_LIST_CHUNK_SIZE):
+    # Under ASGI Django reads a sync iterator to the end before sending it,
+    # so hand it over a chunk of lines at a time instead.
+    next_chunk = sync_to_async(lambda: list(islice(iterator, size)))
+    while chunk := await next_chunk():
+        yield "".join(chunk)
+
+
+SHOPPING_LIST_WRITERS = {
+    "txt": iter_txt,
+    "csv": iter_csv,
+    "json": iter_json,
+}
@@ -0,0 +1,76 @@
+from functools import partial
+
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.images import schedule_variants
+from api.metrics import install_query_recorder
+from api.recipe_cache import invalidate_author, invalidate_recipe
+from recipes.models import Recipe, RecipeIngredient
+from users.models import User
+
+
+def mark_recipe_variants(recipe_id, name):
+    if (
+        Recipe.objects.filter(pk=recipe_id, image=name)
+        .exclude(image_variants_source=name)
+        .update(image_variants_source=name)
+    ):
+        invalidate_recipe(recipe_id)
+
+
+def mark_avatar_variants(user_id, name):
+    if (
+        User.objects.filter(pk=user_id, avatar=name)
+        .exclude(avatar_variants_source=name)
+        .update(avatar_variants_source=name)
+    ):
+        invalidate_author(user_id)
+
+
+@receiver(post_save, sender=Recipe)
+def create_recipe_image_variants(sender, instance, update_fields, **kwargs):
+    if (
+        update_fields is None or "image" in update_fields
+    ) and instance.image_variants_source != instance.image.name:
+        schedule_variants(
+            instance.image,
+            partial(mark_recipe_variants, instance.pk, instance.image.name),
+        )
+
+
+@receiver(post_save, sender=User)
+def create_avatar_variants(sender, instance, update_fields, **kwargs):
+    if (
+        update_fields is None or "avatar" in update_fields
+    ) and instance.avatar_variants_source != instance.avatar.name:
+        schedule_variants(
+            instance.avatar,
+            partial(mark_avatar_variants, instance.pk, instance.avatar.name),
+        )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_representation(sender, instance, **kwargs):
+    invalidate_recipe(instance.pk)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def invalidate_recipe_ingredients(sender, instance, **kwargs):
+    invalidate_recipe(instance.recipe_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_representation(
+    sender, instance, update_fields, **kwargs
+):
+    if update_fields is None or set(update_fields) - {"last_login"}:
+        invalidate_author(instance.pk)
+
+
+@receiver(connection_created)
+def record_connection_queries(sender, connection, **kwargs):
+    install_query_recorder(connection)
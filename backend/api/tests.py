@@ -0,0 +1,435 @@
+import base64
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from ingredients.models import Ingredient
+from recipes.cart_totals import rebuild_cart_totals
+from recipes.models import Favorite, Recipe, RecipeIngredient, ShoppingCart
+from users.models import Subscription, User
+
+FIXTURE_SIZES = (1, 10, 100)
+INGREDIENTS_PER_RECIPE = 3
+INGREDIENTS_COUNT = max(FIXTURE_SIZES) * 2
+
+# Budgets are measured with a cold cache and include the savepoints that
+# TestCase adds around atomic blocks. Every endpoint must also issue the same
+# number of queries for all fixture sizes.
+READ_BUDGETS = (
+    ("recipe-list", False, "/api/recipes/?limit={size}", 4),
+    ("recipe-list", True, "/api/recipes/?limit={size}", 6),
+    (
+        "recipe-list-favorited",
+        True,
+        "/api/recipes/?is_favorited=1&limit={size}",
+        6,
+    ),
+    (
+        "recipe-list-in-cart",
+        True,
+        "/api/recipes/?is_in_shopping_cart=1&limit={size}",
+        6,
+    ),
+    (
+        "recipe-list-search",
+        False,
+        "/api/recipes/?search=рецепт&limit={size}",
+        4,
+    ),
+    (
+        "recipe-list-search",
+        True,
+        "/api/recipes/?search=рецепт&is_favorited=1&limit={size}",
+        6,
+    ),
+    (
+        "recipe-list-cursor",
+        False,
+        "/api/recipes/?pagination=cursor&limit={size}",
+        3,
+    ),
+    ("recipe-detail", False, "/api/recipes/{recipe}/", 3),
+    ("recipe-detail", True, "/api/recipes/{recipe}/", 5),
+    ("user-list", False, "/api/users/?limit={size}", 2),
+    ("user-list", True, "/api/users/?limit={size}", 4),
+    ("user-detail", False, "/api/users/{author}/", 1),
+    ("user-detail", True, "/api/users/{author}/", 3),
+    ("user-me", True, "/api/users/me/", 2),
+    (
+        "user-subscriptions",
+        True,
+        "/api/users/subscriptions/?limit={size}&recipes_limit={size}",
+        4,
+    ),
+    ("recipe-get-link", False, "/api/recipes/{recipe}/get-link/", 1),
+    ("short-link", False, "/api/s/{short_link}/", 1),
+    ("ingredient-list", False, "/api/ingredients/", 1),
+    ("ingredient-detail", False, "/api/ingredients/{ingredient}/", 1),
+    (
+        "download-shopping-cart",
+        True,
+        "/api/recipes/download_shopping_cart/",
+        2,
+    ),
+)
+
+# Recipe payloads carry as many ingredients as the fixture size, so create
+# and update must stay flat as the ingredient list grows.
+WRITE_BUDGETS = (
+    ("recipe-create", "post", "/api/recipes/", "recipe", 8),
+    ("recipe-replace", "patch", "/api/recipes/{own_recipe}/", "replace", 14),
+    ("recipe-amounts", "patch", "/api/recipes/{own_recipe}/", "amounts", 12),
+    ("recipe-delete", "delete", "/api/recipes/{own_recipe}/", None, 9),
+    ("favorite-delete", "delete", "/api/recipes/{recipe}/favorite/", None, 5),
+    ("favorite-create", "post", "/api/recipes/{recipe}/favorite/", None, 5),
+    (
+        "cart-delete",
+        "delete",
+        "/api/recipes/{recipe}/shopping_cart/",
+        None,
+        10,
+    ),
+    ("cart-create", "post", "/api/recipes/{recipe}/shopping_cart/", None, 9),
+    ("cart-clear", "delete", "/api/recipes/shopping_cart/clear/", None, 5),
+    (
+        "subscribe-delete",
+        "delete",
+        "/api/users/{author}/subscribe/",
+        None,
+        3,
+    ),
+    ("subscribe-create", "post", "/api/users/{author}/subscribe/", None, 7),
+    ("avatar-update", "put", "/api/users/me/avatar/", "avatar", 2),
+    ("avatar-delete", "delete", "/api/users/me/avatar/", None, 2),
+)
+
+BULK_BUDGETS = (
+    ("favorite-bulk-delete", "delete", "/api/recipes/favorite/", 5),
+    ("favorite-bulk-create", "post", "/api/recipes/favorite/", 5),
+    ("cart-bulk-delete", "delete", "/api/recipes/shopping_cart/", 10),
+    ("cart-bulk-create", "post", "/api/recipes/shopping_cart/", 9),
+)
+
+RECIPE_PAYLOADS = {
+    "recipe": (0, 1),
+    "replace": (1, 1),
+    "amounts": (1, 2),
+}
+
+
+def make_image():
+    buffer = BytesIO()
+    Image.new("RGB", (1, 1), "orange").save(buffer, "PNG")
+    return (
+        "data:image/png;base64,"
+        + base64.b64encode(buffer.getvalue()).decode()
+    )
+
+
+class QueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        media_root = cls.enterClassContext(tempfile.TemporaryDirectory())
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root))
+
+    def setUp(self):
+        cache.clear()
+        self.viewer = User.objects.create_user(
+            username="viewer",
+            email="viewer@example.com",
+            first_name="Зритель",
+            last_name="Тестовый",
+            password="password",
+        )
+        self.anonymous_client = APIClient()
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=(
+                f"Token {Token.objects.create(user=self.viewer).key}"
+            )
+        )
+        self.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f"Ингредиент {index}", measurement_unit="г")
+            for index in range(INGREDIENTS_COUNT)
+        )
+        self.authors = []
+        self.recipes = []
+        self.own_recipe = None
+
+    def grow_fixtures(self, size):
+        start = len(self.authors)
+        authors = User.objects.bulk_create(
+            User(
+                username=f"author-{index}",
+                email=f"author-{index}@example.com",
+                first_name="Автор",
+                last_name=f"Номер {index}",
+            )
+            for index in range(start, size)
+        )
+        authors = list(
+            User.objects.filter(
+                username__in=[author.username for author in authors]
+            ).order_by("pk")
+        )
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=author,
+                name=f"Рецепт {author.username}",
+                text="Описание",
+                cooking_time=10,
+                image="recipes/pics/test.png",
+                short_link=f"link{author.pk}",
+            )
+            for author in authors
+        )
+        recipes = list(
+            Recipe.objects.filter(author__in=authors).order_by("pk")
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=self.ingredients[
+                    (index + offset) % len(self.ingredients)
+                ],
+                amount=offset + 1,
+            )
+            for index, recipe in enumerate(recipes)
+            for offset in range(INGREDIENTS_PER_RECIPE)
+        )
+        Subscription.objects.bulk_create(
+            Subscription(subscriber=self.viewer, author=author)
+            for author in authors
+        )
+        Favorite.objects.bulk_create(
+            Favorite(user=self.viewer, recipe=recipe) for recipe in recipes
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=self.viewer, recipe=recipe)
+            for recipe in recipes
+        )
+        rebuild_cart_totals()
+        self.authors += authors
+        self.recipes += recipes
+
+    def format_url(self, url):
+        return url.format(
+            size=len(self.recipes),
+            recipe=self.recipes[-1].pk,
+            short_link=self.recipes[-1].short_link,
+            author=self.authors[-1].pk,
+            own_recipe=self.own_recipe,
+            ingredient=self.ingredients[0].pk,
+        )
+
+    def build_payload(self, kind, size):
+        if kind == "avatar":
+            return {"avatar": make_image()}
+        # Updates first swap every ingredient for another one, then change
+        # only the amounts.
+        offset, amount = RECIPE_PAYLOADS[kind]
+        start = offset * size
+        return {
+            "name": f"Рецепт на {size} ингредиентов",
+            "text": "Описание",
+            "cooking_time": 10,
+            "image": make_image(),
+            "ingredients": [
+                {"id": ingredient.pk, "amount": amount}
+                for ingredient in self.ingredients[start:start + size]
+            ],
+        }
+
+    def count_queries(
+        self, client, method, url, data=None, expected_status=None
+    ):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method)(url, data, format="json")
+            if response.streaming:
+                b"".join(response.streaming_content)
+        if expected_status is None:
+            self.assertLess(response.status_code, 400, url)
+        else:
+            self.assertEqual(response.status_code, expected_status, url)
+        # Row count estimates are asked from the planner on PostgreSQL only.
+        return (
+            sum(
+                not query["sql"].startswith("EXPLAIN")
+                for query in context.captured_queries
+            ),
+            response,
+        )
+
+    def assert_budget(self, name, counts, budget):
+        self.assertEqual(
+            len(set(counts.values())),
+            1,
+            f"{name}: число запросов растёт с размером данных: {counts}",
+        )
+        self.assertLessEqual(
+            max(counts.values()),
+            budget,
+            f"{name}: превышен бюджет запросов: {counts}",
+        )
+
+    def test_read_endpoints(self):
+        counts = {index: {} for index in range(len(READ_BUDGETS))}
+        for size in FIXTURE_SIZES:
+            self.grow_fixtures(size)
+            for index, (name, authenticated, url, budget) in enumerate(
+                READ_BUDGETS
+            ):
+                client = (
+                    self.client if authenticated else self.anonymous_client
+                )
+                counts[index][size], response = self.count_queries(
+                    client, "get", self.format_url(url)
+                )
+                if "limit={size}" in url:
+                    self.assertEqual(
+                        len(response.data["results"]), size, name
+                    )
+        for index, (name, authenticated, url, budget) in enumerate(
+            READ_BUDGETS
+        ):
+            with self.subTest(endpoint=name, authenticated=authenticated):
+                self.assert_budget(name, counts[index], budget)
+
+    def test_write_endpoints(self):
+        counts = {name: {} for name, *_ in WRITE_BUDGETS}
+        for size in FIXTURE_SIZES:
+            self.grow_fixtures(size)
+            for name, method, url, payload, budget in WRITE_BUDGETS:
+                counts[name][size], response = self.count_queries(
+                    self.client,
+                    method,
+                    self.format_url(url),
+                    payload and self.build_payload(payload, size),
+                )
+                if payload in RECIPE_PAYLOADS:
+                    self.own_recipe = response.data["id"]
+                    self.assertEqual(
+                        len(response.data["ingredients"]), size, name
+                    )
+        for name, method, url, payload, budget in WRITE_BUDGETS:
+            with self.subTest(endpoint=name):
+                self.assert_budget(name, counts[name], budget)
+
+    def test_anonymous_write_endpoints(self):
+        self.grow_fixtures(1)
+        self.own_recipe = self.recipes[-1].pk
+        for name, method, url, payload, budget in WRITE_BUDGETS:
+            with self.subTest(endpoint=name):
+                queries, _ = self.count_queries(
+                    self.anonymous_client,
+                    method,
+                    self.format_url(url),
+                    payload and self.build_payload(payload, 1),
+                    expected_status=401,
+                )
+                self.assertEqual(queries, 0, name)
+        for name, method, url, budget in BULK_BUDGETS:
+            with self.subTest(endpoint=name):
+                queries, _ = self.count_queries(
+                    self.anonymous_client,
+                    method,
+                    url,
+                    {"recipes": [self.own_recipe]},
+                    expected_status=401,
+                )
+                self.assertEqual(queries, 0, name)
+
+    def test_bulk_endpoints(self):
+        counts = {name: {} for name, *_ in BULK_BUDGETS}
+        for size in FIXTURE_SIZES:
+            self.grow_fixtures(size)
+            recipe_ids = [recipe.pk for recipe in self.recipes]
+            for name, method, url, budget in BULK_BUDGETS:
+                counts[name][size], response = self.count_queries(
+                    self.client, method, url, {"recipes": recipe_ids}
+                )
+                self.assertEqual(len(response.data), size, name)
+        for name, method, url, budget in BULK_BUDGETS:
+            with self.subTest(endpoint=name):
+                self.assert_budget(name, counts[name], budget)
+
+
+@override_settings(ROOT_URLCONF="foodgram_back.asgi_urls")
+class AsyncQueryBudgetTests(QueryBudgetTests):
+    pass
+
+
+class ShoppingListErrorTests(TestCase):
+
+    def test_errors_are_rendered_as_json(self):
+        user = User.objects.create_user(
+            username="buyer",
+            email="buyer@example.com",
+            first_name="Покупатель",
+            last_name="Тестовый",
+            password="password",
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        for client, headers, status_code in (
+            (APIClient(), {}, 401),
+            (client, {"HTTP_ACCEPT": "application/xml"}, 406),
+        ):
+            with self.subTest(status=status_code):
+                response = client.get(
+                    "/api/recipes/download_shopping_cart/", **headers
+                )
+                self.assertEqual(response.status_code, status_code)
+                self.assertEqual(response["Content-Type"], "application/json")
+                self.assertIn("detail", response.json())
+
+
+class RecipePayloadTests(TestCase):
+
+    def test_non_object_body_is_rejected(self):
+        client = APIClient()
+        client.force_authenticate(
+            User.objects.create_user(
+                username="cook",
+                email="cook@example.com",
+                first_name="Повар",
+                last_name="Тестовый",
+                password="password",
+            )
+        )
+        for body in ([], "x"):
+            with self.subTest(body=body):
+                response = client.post("/api/recipes/", body, format="json")
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("non_field_errors", response.json())
+
+
+class MetricsAccessTests(TestCase):
+
+    def test_metrics_require_token(self):
+        with mock.patch("api.views.METRICS_TOKEN", ""):
+            self.assertEqual(self.client.get("/metrics").status_code, 404)
+        with mock.patch("api.views.METRICS_TOKEN", "secret"):
+            self.assertEqual(self.client.get("/metrics").status_code, 404)
+            self.assertEqual(
+                self.client.get(
+                    "/metrics", headers={"Authorization": "Bearer wrong"}
+                ).status_code,
+                404,
+            )
+            response = self.client.get(
+                "/metrics", headers={"Authorization": "Bearer secret"}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"# TYPE", response.content)
@@ -1,9 +1,17 @@
-from io import BytesIO
+from secrets import compare_digest
 
 from django.core.files.storage import default_storage
-from django.db.models import Exists, OuterRef, Sum
-from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, F, OuterRef, Prefetch
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect
+from django.utils.cache import parse_etags
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.serializers import SetPasswordSerializer
 from djoser.views import UserViewSet as AuthUserViewSet
@@ -14,24 +22,41 @@ from rest_framework.permissions import (
     IsAuthenticated,
     IsAuthenticatedOrReadOnly,
 )
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
 
 from api.filters import CustomRecipeFilter, CustomIngredientFilter
-from api.pagination import CustomPagination
+from api.metrics import render_prometheus, request_metrics
+from api.pagination import CustomPagination, RecipePagination
 from api.permission import IsAuthorOrReadOnly
+from api.renderers import CSVRenderer, PlainTextRenderer
+from api.shopping_list import (
+    SHOPPING_LIST_CHUNK_SIZE,
+    SHOPPING_LIST_FILENAME,
+    SHOPPING_LIST_WRITERS,
+    aiter_in_chunks,
+)
+from recipes.cart_totals import (
+    add_recipes_to_cart_totals,
+    remove_recipes_from_cart_totals,
+)
 from recipes.models import (
     Favorite,
     Recipe,
-    RecipeIngredient,
     ShoppingCart,
+    ShoppingCartIngredient,
 )
+from recipes.relations import add_relations, remove_relations
+from recipes.short_links import short_link_resolver
+from ingredients.catalog import ingredient_catalog
 from ingredients.models import Ingredient
-from users.models import User
+from users.models import Subscription, User
 
 from api.serializers.ingredients import IngredientSerializer
 from api.serializers.recipes import (
     CartSerializer,
+    RecipeIdsSerializer,
     RecipeDetailSerializer,
     RecipeCreateSerializer,
     FavoriteRecipeSerializer,
@@ -39,11 +64,13 @@ from api.serializers.recipes import (
 from api.serializers.users import (
     UserAvatarSerializer,
     SubscriptionDetailSerializer,
-    SubscriptionCreateSerializer,
     UserDetailSerializer,
     UserRegistrationSerializer,
+    get_recipes_limit,
 )
 
+from foodgram_back.settings import METRICS_TOKEN
+
 
 class UserActionsViewSet(AuthUserViewSet):
     pagination_class = CustomPagination
@@ -54,8 +81,6 @@ class UserActionsViewSet(AuthUserViewSet):
         if self.action == "avatar":
             return UserAvatarSerializer
         if self.action in ["subscriptions", "subscribe"]:
-            if self.request.method == "POST":
-                return SubscriptionCreateSerializer
             return SubscriptionDetailSerializer
         return UserDetailSerializer
 
@@ -102,6 +127,26 @@ class UserActionsViewSet(AuthUserViewSet):
             else None
         )
 
+    def get_subscriptions_queryset(self, request):
+        author_recipes = Recipe.objects.defer("search_vector")
+        recipes_limit = get_recipes_limit(request)
+        if recipes_limit is not None:
+            author_recipes = author_recipes[:recipes_limit]
+        return (
+            User.objects.filter(
+                id__in=request.user.subscriptions.values("author")
+            )
+            .annotate(recipes_count=Count("recipes"))
+            .order_by("username")
+            .prefetch_related(
+                Prefetch(
+                    "recipes",
+                    queryset=author_recipes,
+                    to_attr="limited_recipes",
+                )
+            )
+        )
+
     @action(
         methods=["GET"],
         detail=False,
@@ -109,9 +154,7 @@ class UserActionsViewSet(AuthUserViewSet):
         url_path="subscriptions",
     )
     def subscriptions(self, request):
-        authors = User.objects.filter(
-            id__in=request.user.subscriptions.values("author")
-        )
+        authors = self.get_subscriptions_queryset(request)
         page = self.paginate_queryset(authors)
         serializer = self.get_serializer(
             page, many=True, context={"request": request}
@@ -133,12 +176,28 @@ class UserActionsViewSet(AuthUserViewSet):
         return self.delete_subscription(request, author)
 
     def create_subscription(self, request, author):
-        serializer = SubscriptionCreateSerializer(
-            data={"subscriber": request.user.id, "author": author.id},
-            context={"request": request},
+        if request.user == author:
+            return Response(
+                {"author": ["Нельзя подписаться на самого себя."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            with transaction.atomic():
+                Subscription.objects.create(
+                    subscriber=request.user, author=author
+                )
+        except IntegrityError:
+            return Response(
+                {"author": ["Вы уже подписаны на этого автора."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        serializer = SubscriptionDetailSerializer(
+            author,
+            context={
+                "request": request,
+                "subscribed_author_ids": {author.id},
+            },
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete_subscription(self, request, author):
@@ -171,7 +230,7 @@ class UserActionsViewSet(AuthUserViewSet):
 
 class RecipeAPIViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
-    pagination_class = CustomPagination
+    pagination_class = RecipePagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = CustomRecipeFilter
 
@@ -185,6 +244,8 @@ class RecipeAPIViewSet(viewsets.ModelViewSet):
         relation_model,
         response_serializer,
         duplicate_message,
+        on_added=None,
+        on_removed=None,
     ):
         current_user = req.user
         target_recipe = get_object_or_404(Recipe, id=recipe_id)
@@ -197,32 +258,44 @@ class RecipeAPIViewSet(viewsets.ModelViewSet):
                 response_serializer,
                 duplicate_message,
                 req,
+                on_added,
             )
         return self.remove_relation(
-            current_user, recipe_id, relation_model
+            current_user, recipe_id, relation_model, on_removed
         )
 
     def add_relation(
-        self, user, recipe, model, serializer_class, error_msg, request
+        self,
+        user,
+        recipe,
+        model,
+        serializer_class,
+        error_msg,
+        request,
+        on_added=None,
     ):
-        if model.objects.filter(recipe=recipe, user=user).exists():
+        try:
+            with transaction.atomic():
+                relation = model.objects.create(recipe=recipe, user=user)
+                if on_added:
+                    on_added(user.id, [recipe.id])
+        except IntegrityError:
             return Response(
                 {"message": error_msg.format(recipe.name)},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-
         serialized_data = serializer_class(
-            data={"recipe": recipe.id, "user": user.id},
-            context={"request": request},
+            relation, context={"request": request}
         )
-        serialized_data.is_valid(raise_exception=True)
-        serialized_data.save()
         return Response(serialized_data.data, status=status.HTTP_201_CREATED)
 
-    def remove_relation(self, user, recipe_id, model):
-        removal_result = model.objects.filter(
-            recipe__id=recipe_id, user=user
-        ).delete()
+    def remove_relation(self, user, recipe_id, model, on_removed=None):
+        with transaction.atomic():
+            removal_result = model.objects.filter(
+                recipe__id=recipe_id, user=user
+            ).delete()
+            if on_removed and removal_result[0] > 0:
+                on_removed(user.id, [int(recipe_id)])
 
         if removal_result[0] > 0:
             return Response(status=status.HTTP_204_NO_CONTENT)
@@ -231,6 +304,51 @@ class RecipeAPIViewSet(viewsets.ModelViewSet):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
+    def manage_user_interactions(
+        self, request, relation_model, on_added=None, on_removed=None
+    ):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data["recipes"]
+        user = request.user
+        found = set(
+            Recipe.objects.filter(id__in=recipe_ids).values_list(
+                "id", flat=True
+            )
+        )
+        # Only rows this request really inserted or deleted count, so
+        # concurrent requests never apply the same cart change twice.
+        with transaction.atomic():
+            if request.method == "POST":
+                changed = add_relations(relation_model, user.id, recipe_ids)
+                if on_added:
+                    on_added(user.id, changed)
+                statuses = ("added", "already_added")
+            else:
+                changed = remove_relations(
+                    relation_model, user.id, recipe_ids
+                )
+                if on_removed:
+                    on_removed(user.id, changed)
+                statuses = ("removed", "not_in_list")
+        changed = set(changed)
+        return Response(
+            [
+                {
+                    "id": recipe_id,
+                    "status": (
+                        statuses[0]
+                        if recipe_id in changed
+                        else statuses[1]
+                        if recipe_id in found
+                        else "not_found"
+                    ),
+                }
+                for recipe_id in recipe_ids
+            ],
+            status=status.HTTP_200_OK,
+        )
+
     @action(
         methods=["POST", "DELETE"],
         detail=True,
@@ -247,6 +365,16 @@ class RecipeAPIViewSet(viewsets.ModelViewSet):
             duplicate_message='Рецепт "{}" уже в ваших закладках.',
         )
 
+    @action(
+        methods=["POST", "DELETE"],
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        url_path="favorite",
+        url_name="favorite-bulk",
+    )
+    def bookmark_recipes(self, request):
+        return self.manage_user_interactions(request, Favorite)
+
     @action(
         methods=["POST", "DELETE"],
         detail=True,
@@ -261,16 +389,58 @@ class RecipeAPIViewSet(viewsets.ModelViewSet):
             relation_model=ShoppingCart,
             response_serializer=CartSerializer,
             duplicate_message='Рецепт "{}" уже в вашей корзине.',
+            on_added=add_recipes_to_cart_totals,
+            on_removed=remove_recipes_from_cart_totals,
         )
 
+    @action(
+        methods=["POST", "DELETE"],
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        url_path="shopping_cart",
+        url_name="shopping_cart-bulk",
+    )
+    def manage_carts(self, request):
+        return self.manage_user_interactions(
+            request,
+            ShoppingCart,
+            on_added=add_recipes_to_cart_totals,
+            on_removed=remove_recipes_from_cart_totals,
+        )
+
+    @action(
+        methods=["DELETE"],
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        url_path="shopping_cart/clear",
+        url_name="shopping_cart-clear",
+    )
+    def clear_cart(self, request):
+        with transaction.atomic():
+            request.user.shopping_carts.all().delete()
+            request.user.cart_ingredients.all().delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # The shopping list renderers are for the file itself; errors keep
+        # the JSON format of the rest of the API.
+        if (
+            self.action == "export_ingredients"
+            and isinstance(response, Response)
+            and response.status_code >= 400
+        ):
+            request.accepted_renderer = JSONRenderer()
+            request.accepted_media_type = JSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
+
     def get_serializer_class(self):
         if self.request.method in ("GET", "HEAD", "OPTIONS"):
             return RecipeDetailSerializer
         return RecipeCreateSerializer
 
     def get_queryset(self):
-        queryset = Recipe.objects.select_related("author").prefetch_related(
-            "ingredient", "recipe_ingredients", "shopping_carts", "favorites"
+        queryset = Recipe.objects.select_related("author").defer(
+            "search_vector"
         )
         if self.request.user.is_authenticated:
             user = self.request.user
@@ -301,39 +471,40 @@ class RecipeAPIViewSet(viewsets.ModelViewSet):
         methods=["GET"],
         detail=False,
         permission_classes=[IsAuthenticated],
+        renderer_classes=[PlainTextRenderer, CSVRenderer, JSONRenderer],
         url_path="download_shopping_cart",
         url_name="download_shopping_cart",
     )
     def export_ingredients(self, request):
+        export_format = request.accepted_renderer.format
         ingredient_data = self.compile_ingredient_data(request.user)
-        file_content = self.create_shopping_list_file(ingredient_data)
-        return self.send_file_response(file_content)
+        file_content = SHOPPING_LIST_WRITERS[export_format](
+            ingredient_data.iterator(chunk_size=SHOPPING_LIST_CHUNK_SIZE)
+        )
+        if isinstance(request._request, ASGIRequest):
+            file_content = aiter_in_chunks(file_content)
+        return self.send_file_response(
+            file_content, request.accepted_renderer, export_format
+        )
 
     def compile_ingredient_data(self, user):
         return (
-            RecipeIngredient.objects.filter(recipe__shopping_carts__user=user)
-            .values("ingredient__name", "ingredient__measurement_unit")
-            .annotate(total_amount=Sum("amount"))
+            ShoppingCartIngredient.objects.filter(user=user)
+            .values(
+                "ingredient__name",
+                "ingredient__measurement_unit",
+                total_amount=F("amount"),
+            )
             .order_by("ingredient__name")
         )
 
-    def create_shopping_list_file(self, ingredients):
-        list_content = "\n".join(
-            f'{item["ingredient__name"]} - {item["total_amount"]} \
-        {item["ingredient__measurement_unit"]}'
-            for item in ingredients
-        )
-        file_buffer = BytesIO()
-        file_buffer.write(list_content.encode("utf-8"))
-        file_buffer.seek(0)
-        return file_buffer
-
-    def send_file_response(self, file_buffer):
-        response = HttpResponse(
-            file_buffer, content_type="text/plain; charset=utf-8"
+    def send_file_response(self, file_content, renderer, export_format):
+        response = StreamingHttpResponse(
+            file_content,
+            content_type=f"{renderer.media_type}; charset=utf-8",
         )
         response["Content-Disposition"] = (
-            'attachment; filename="shopping_list.txt"'
+            f'attachment; filename="{SHOPPING_LIST_FILENAME}.{export_format}"'
         )
         return response
 
@@ -346,7 +517,9 @@ class RecipeAPIViewSet(viewsets.ModelViewSet):
     )
     def generate_shareable_link(self, request, pk=None):
         recipe = get_object_or_404(Recipe, pk=pk)
-        link_path = reverse("short_url", args=[recipe.pk])
+        if not recipe.short_link:
+            recipe.save(update_fields=["short_link"])
+        link_path = reverse("short_url", args=[recipe.short_link])
         return Response(
             {"short-link": request.build_absolute_uri(link_path)},
             status=status.HTTP_200_OK,
@@ -354,12 +527,22 @@ class RecipeAPIViewSet(viewsets.ModelViewSet):
 
 
 def handle_shortlink(request, short_link):
-    try:
-        recipe_id = int(short_link)
-        recipe = get_object_or_404(Recipe, pk=recipe_id)
-        return redirect("api:recipe-detail", pk=recipe.id)
-    except ValueError:
-        raise ValueError("Invalid short link")
+    recipe_id = short_link_resolver.resolve(short_link)
+    if recipe_id is None:
+        raise Http404("Рецепт не найден.")
+    return redirect("api:recipe-detail", pk=recipe_id)
+
+
+def metrics(request):
+    # Without METRICS_TOKEN the endpoint is switched off.
+    if not METRICS_TOKEN or not compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {METRICS_TOKEN}"
+    ):
+        raise Http404
+    return HttpResponse(
+        render_prometheus(*request_metrics.collect()),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
 
 
 class IngredientAPIViewSet(viewsets.ReadOnlyModelViewSet):
@@ -370,3 +553,25 @@ class IngredientAPIViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = CustomIngredientFilter
     search_fields = ("^name",)
+
+    def list(self, request, *args, **kwargs):
+        return self.get_catalog_response(
+            request,
+            *ingredient_catalog.lookup(request.query_params.get("name", "")),
+        )
+
+    def get_catalog_response(self, request, etag, payload, ingredients):
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = HttpResponseNotModified()
+        elif (
+            not request.query_params.get("name")
+            and request.accepted_renderer.format == "json"
+        ):
+            response = HttpResponse(
+                payload, content_type="application/json"
+            )
+        else:
+            response = Response(ingredients)
+        response["ETag"] = etag
+        response["Cache-Control"] = "public, no-cache"
+        return response
@@ -7,10 +7,24 @@ For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 """
 
+import logging
 import os
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram_back.settings")
+os.environ.setdefault("DJANGO_ROOT_URLCONF", "foodgram_back.asgi_urls")
 
 application = get_asgi_application()
+
+try:
+    from ingredients.catalog import ingredient_catalog
+
+    ingredient_catalog.refresh()
+except Exception:
+    # The first request retries the load, so an unavailable database or
+    # cache must not keep the worker from starting.
+    logging.getLogger(__name__).warning(
+        "Не удалось загрузить каталог ингредиентов при запуске",
+        exc_info=True,
+    )
@@ -0,0 +1,23 @@
+from django.urls import include, path
+
+from api import async_views
+
+urlpatterns = [
+    path("api/recipes/", async_views.recipe_list, name="recipe-list"),
+    path(
+        "api/recipes/<int:pk>/",
+        async_views.recipe_detail,
+        name="recipe-detail",
+    ),
+    path(
+        "api/users/subscriptions/",
+        async_views.subscriptions,
+        name="user-subscriptions",
+    ),
+    path(
+        "api/ingredients/",
+        async_views.ingredient_list,
+        name="ingredient-list",
+    ),
+    path("", include("foodgram_back.urls")),
+]
@@ -0,0 +1,48 @@
+CONNECTION_MODES = ("none", "persistent", "pool")
+
+
+def get_connection_settings(mode, conn_max_age, pool_options):
+    if mode not in CONNECTION_MODES:
+        raise ValueError(
+            f"Неизвестный режим подключения к базе данных: {mode}"
+        )
+    if mode == "pool":
+        return {
+            "CONN_MAX_AGE": 0,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {"pool": dict(pool_options)},
+        }
+    if mode == "persistent":
+        return {
+            "CONN_MAX_AGE": conn_max_age,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {},
+        }
+    return {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False, "OPTIONS": {}}
+
+
+def get_pool(alias="default"):
+    from django.db import connections
+
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        return None
+    return connection.pool
+
+
+def get_pool_stats(alias="default", reset=False):
+    pool = get_pool(alias)
+    if pool is None:
+        return None
+    stats = pool.pop_stats() if reset else pool.get_stats()
+    return {
+        "size": stats.get("pool_size", 0),
+        "available": stats.get("pool_available", 0),
+        "max_size": stats.get("pool_max", 0),
+        "requests": stats.get("requests_num", 0),
+        "waiting": stats.get("requests_waiting", 0),
+        "queued": stats.get("requests_queued", 0),
+        "wait_ms": stats.get("requests_wait_ms", 0),
+        "timeouts": stats.get("requests_errors", 0),
+        "connections_ms": stats.get("connections_ms", 0),
+    }
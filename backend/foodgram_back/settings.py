@@ -13,6 +13,9 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 from pathlib import Path
 from dotenv import load_dotenv
 import os
+import tempfile
+
+from foodgram_back.db_pool import get_connection_settings
 
 PAGE_SIZE = 10
 MAX_USERNAME_FIRST_LAST_NAME_LENGTH = 150
@@ -24,6 +27,15 @@ MIN_COOKING_TIME = 1
 MAX_RECIPE_NAME_LENGTH = 256
 MAX_COOKING_TIME = 32000
 MAX_INGREDIENT_AMOUNT = 32000
+MAX_IMAGE_UPLOAD_SIZE = 10 * 1024 * 1024
+SHORT_LINK_LENGTH = 6
+SHORT_LINK_CACHE_SIZE = 10000
+SHORT_LINK_NEGATIVE_TTL = 60
+MAX_BULK_RECIPES = 100
+RECIPE_SEARCH_CONFIG = "russian"
+# pg_trgm extracts no trigrams from shorter patterns, so name substring
+# search below this length would scan the whole table.
+RECIPE_SEARCH_MIN_SUBSTRING_LENGTH = 3
 
 load_dotenv()
 
@@ -60,6 +72,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "users.apps.UsersConfig",
     "ingredients.apps.IngredientsConfig",
     "recipes.apps.RecipesConfig",
@@ -71,6 +84,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -80,7 +94,9 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
-ROOT_URLCONF = "foodgram_back.urls"
+# asgi.py switches to foodgram_back.asgi_urls, which serves the hot read
+# endpoints with async views
+ROOT_URLCONF = os.getenv("DJANGO_ROOT_URLCONF", "foodgram_back.urls")
 
 TEMPLATES = [
     {
@@ -115,6 +131,24 @@ DATABASES = {
     }
 }
 
+# "none" opens a connection per request, "persistent" keeps one per worker
+# thread for DB_CONN_MAX_AGE seconds, "pool" shares a bounded psycopg pool
+# per worker process. Pool timeouts are in seconds. Sync gunicorn workers
+# serve one request at a time, so a pool only adds idle connections there.
+DB_CONNECTION_MODE = os.getenv("DB_CONNECTION_MODE", "persistent")
+DB_CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", 60))
+DB_POOL_OPTIONS = {
+    "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+    "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+    "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", 300)),
+    "timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+}
+DATABASES["default"].update(
+    get_connection_settings(
+        DB_CONNECTION_MODE, DB_CONN_MAX_AGE, DB_POOL_OPTIONS
+    )
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -158,6 +192,18 @@ STATIC_ROOT = BASE_DIR / "all_static"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Uploads larger than this are streamed to a temporary file on disk
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+
+# Resized copies of recipe images and avatars, largest side in pixels
+IMAGE_VARIANTS = {
+    "thumbnail": (160, 160),
+    "card": (480, 480),
+    "full": (1280, 1280),
+}
+IMAGE_VARIANT_QUALITY = 82
+IMAGE_VARIANT_WEBP = True
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -177,6 +223,47 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": PAGE_SIZE,
 }
 
+# Version tokens of the ingredient catalog and recipe representations have
+# to be visible to every worker process, so deployments set REDIS_URL. The
+# local-memory fallback is only correct for a single process.
+REDIS_URL = os.getenv("REDIS_URL")
+CACHES = {
+    "default": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+        if REDIS_URL
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    )
+}
+
+# Paginated listings cache their total count per user and filters for this
+# many seconds (0 disables the cache). Above the threshold PostgreSQL's
+# planner estimate is used instead of an exact COUNT(*) (None disables it).
+PAGINATION_COUNT_CACHE_TIMEOUT = 30
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = 100_000
+
+# Seconds to keep the shared part of a recipe representation (0 disables).
+# Off without REDIS_URL: other workers would keep serving stale copies.
+RECIPE_CACHE_TIMEOUT = int(
+    os.getenv("RECIPE_CACHE_TIMEOUT", 60 * 60 if REDIS_URL else 0)
+)
+
+# Every worker process writes its request metrics to METRICS_DIR from a
+# background thread every METRICS_FLUSH_INTERVAL seconds; /metrics sums all
+# the files.
+# start.sh clears the directory before the server starts.
+METRICS_DIR = os.getenv(
+    "METRICS_DIR", os.path.join(tempfile.gettempdir(), "foodgram-metrics")
+)
+# Scrapers send "Authorization: Bearer <METRICS_TOKEN>"; unset disables it.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 5))
+METRICS_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+
 AUTH_USER_MODEL = "users.User"
 
 DJOSER = {
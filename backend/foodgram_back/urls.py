@@ -1,10 +1,11 @@
 from django.contrib import admin
 from django.urls import include, path
 
-from api.views import handle_shortlink
+from api.views import handle_shortlink, metrics
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("api.urls")),
     path("api/s/<slug:short_link>/", handle_shortlink, name="short_url"),
+    path("metrics", metrics, name="metrics"),
 ]
@@ -7,6 +7,7 @@ For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/wsgi/
 """
 
+import logging
 import os
 
 from django.core.wsgi import get_wsgi_application
@@ -14,3 +15,15 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram_back.settings")
 
 application = get_wsgi_application()
+
+try:
+    from ingredients.catalog import ingredient_catalog
+
+    ingredient_catalog.refresh()
+except Exception:
+    # The first request retries the load, so an unavailable database or
+    # cache must not keep the worker from starting.
+    logging.getLogger(__name__).warning(
+        "Не удалось загрузить каталог ингредиентов при запуске",
+        exc_info=True,
+    )
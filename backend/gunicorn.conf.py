@@ -0,0 +1,10 @@
+import os
+
+bind = "0.0.0.0:8000"
+
+# SERVER_INTERFACE=asgi serves the async read views on uvicorn workers.
+if os.getenv("SERVER_INTERFACE", "wsgi") == "asgi":
+    worker_class = "uvicorn_worker.UvicornWorker"
+    wsgi_app = "foodgram_back.asgi"
+else:
+    wsgi_app = "foodgram_back.wsgi"
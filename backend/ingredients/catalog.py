@@ -0,0 +1,92 @@
+import hashlib
+import uuid
+from bisect import bisect_left
+from threading import Lock
+
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from .models import Ingredient
+
+CATALOG_VERSION_KEY = "ingredients:catalog_version"
+
+
+class IngredientCatalog:
+    def __init__(self):
+        self._lock = Lock()
+        self._version = None
+        self._index = ([], [])
+        self._payload = (None, b"[]")
+
+    @staticmethod
+    def _fold(value):
+        return value.casefold()
+
+    def _shared_version(self):
+        version = cache.get(CATALOG_VERSION_KEY)
+        if version is None:
+            version = uuid.uuid4().hex
+            cache.add(CATALOG_VERSION_KEY, version, None)
+            version = cache.get(CATALOG_VERSION_KEY, version)
+        return version
+
+    async def _ashared_version(self):
+        version = await cache.aget(CATALOG_VERSION_KEY)
+        if version is None:
+            version = uuid.uuid4().hex
+            await cache.aadd(CATALOG_VERSION_KEY, version, None)
+            version = await cache.aget(CATALOG_VERSION_KEY, version)
+        return version
+
+    def _queryset(self):
+        return Ingredient.objects.values("id", "name", "measurement_unit")
+
+    def _build(self, version, rows):
+        rows = sorted(rows, key=lambda row: self._fold(row["name"]))
+        self._index = ([self._fold(row["name"]) for row in rows], rows)
+        payload = JSONRenderer().render(rows)
+        self._payload = (f'"{hashlib.sha256(payload).hexdigest()}"', payload)
+        self._version = version
+
+    def refresh(self):
+        version = self._shared_version()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._build(version, self._queryset())
+        return self._version
+
+    async def arefresh(self):
+        version = await self._ashared_version()
+        if version != self._version:
+            rows = [row async for row in self._queryset()]
+            with self._lock:
+                if version != self._version:
+                    self._build(version, rows)
+        return self._version
+
+    def invalidate(self):
+        transaction.on_commit(
+            lambda: cache.set(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+        )
+
+    def lookup(self, prefix=""):
+        self.refresh()
+        return (*self._payload, self._search(prefix))
+
+    async def alookup(self, prefix=""):
+        await self.arefresh()
+        return (*self._payload, self._search(prefix))
+
+    def _search(self, prefix):
+        keys, rows = self._index
+        if not prefix:
+            return rows
+        prefix = self._fold(prefix)
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + "\U0010ffff", start)
+        return rows[start:end]
+
+
+ingredient_catalog = IngredientCatalog()
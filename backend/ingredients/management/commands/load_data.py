@@ -1,32 +1,153 @@
+import csv
 import json
+import time
+from pathlib import Path
+
 from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...catalog import ingredient_catalog
 from ...models import Ingredient
 
+READ_CHUNK_SIZE = 64 * 1024
+DEFAULT_BATCH_SIZE = 500
+
+
+def iter_json_entries(file):
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    eof = False
+    while True:
+        buffer = buffer.lstrip()
+        if not started:
+            if buffer:
+                if buffer[0] != "[":
+                    raise ValueError("Ожидался JSON-массив ингредиентов")
+                buffer = buffer[1:]
+                started = True
+                continue
+        elif buffer.startswith("]"):
+            return
+        elif buffer.startswith(","):
+            buffer = buffer[1:]
+            continue
+        elif buffer:
+            try:
+                entry, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield entry
+                buffer = buffer[end:]
+                continue
+        if eof:
+            raise ValueError("Неожиданный конец JSON-файла")
+        chunk = file.read(READ_CHUNK_SIZE)
+        eof = not chunk
+        buffer += chunk
+
+
+def iter_csv_entries(file):
+    for row in csv.reader(file):
+        if len(row) < 2:
+            continue
+        yield {"name": row[0], "measurement_unit": row[1]}
+
 
 class Command(BaseCommand):
+    help = "Загружает ингредиенты из JSON- или CSV-файла"
+
     def add_arguments(self, parser):
         parser.add_argument(
-            "json_path", type=str, help="Путь к JSON-файлу с ингредиентами"
+            "json_path",
+            type=str,
+            help="Путь к JSON- или CSV-файлу с ингредиентами",
+        )
+        parser.add_argument(
+            "--format",
+            choices=("json", "csv"),
+            help="Формат файла, по умолчанию определяется по расширению",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Количество ингредиентов в одном запросе",
+        )
+        parser.add_argument(
+            "--ignore-existing",
+            action="store_true",
+            help="Не обновлять единицы измерения существующих ингредиентов",
         )
 
     def handle(self, *args, **options):
         json_path = options["json_path"]
+        file_format = options["format"] or (
+            "csv" if Path(json_path).suffix.lower() == ".csv" else "json"
+        )
+        read_entries = (
+            iter_csv_entries if file_format == "csv" else iter_json_entries
+        )
+        started_at = time.monotonic()
         try:
-            with open(json_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            new_ingredients = []
-            for entry in data:
-                exists = Ingredient.objects.filter(
-                    name=entry["name"],
-                    measurement_unit=entry["measurement_unit"],
-                ).exists()
-                if not exists:
-                    new_ingredients.append(Ingredient(**entry))
-            Ingredient.objects.bulk_create(new_ingredients)
+            with open(json_path, "r", encoding="utf-8", newline="") as f:
+                with transaction.atomic():
+                    processed, saved = self.load(
+                        read_entries(f),
+                        options["batch_size"],
+                        options["ignore_existing"],
+                    )
+            if saved:
+                ingredient_catalog.invalidate()
+            elapsed = time.monotonic() - started_at
             self.stdout.write(
                 self.style.SUCCESS(
-                    f"Добавлено ингредиентов: {len(new_ingredients)}"
+                    f"Обработано записей: {processed}, "
+                    f"добавлено или обновлено ингредиентов: {saved} "
+                    f"за {elapsed:.2f} с "
+                    f"({processed / max(elapsed, 1e-6):.0f} записей/с)"
                 )
             )
         except Exception as err:
             self.stderr.write(self.style.ERROR(f"Ошибка при загрузке: {err}"))
+
+    def load(self, entries, batch_size, ignore_existing):
+        existing = dict(
+            Ingredient.objects.values_list("name", "measurement_unit")
+        )
+        processed = saved = 0
+        batch = {}
+        for entry in entries:
+            processed += 1
+            name = entry["name"].strip()
+            measurement_unit = entry["measurement_unit"].strip()
+            if name in existing and (
+                ignore_existing or existing[name] == measurement_unit
+            ):
+                continue
+            existing[name] = measurement_unit
+            batch[name] = Ingredient(
+                name=name, measurement_unit=measurement_unit
+            )
+            if len(batch) >= batch_size:
+                saved += self.save_batch(batch.values(), ignore_existing)
+                batch = {}
+        if batch:
+            saved += self.save_batch(batch.values(), ignore_existing)
+        return processed, saved
+
+    def save_batch(self, batch, ignore_existing):
+        if ignore_existing:
+            created = Ingredient.objects.bulk_create(
+                batch, ignore_conflicts=True
+            )
+        else:
+            created = Ingredient.objects.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=["name"],
+                update_fields=["measurement_unit"],
+            )
+        return len(created)
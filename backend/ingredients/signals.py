@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import ingredient_catalog
+from .models import Ingredient
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_catalog(sender, **kwargs):
+    ingredient_catalog.invalidate()
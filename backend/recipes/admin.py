@@ -1,6 +1,13 @@
 from django.contrib import admin
+from django.db import transaction
 from django.utils.safestring import mark_safe
 
+from recipes.cart_totals import (
+    add_recipes_to_cart_totals,
+    get_recipe_amounts,
+    remove_recipes_from_cart_totals,
+    sync_recipe_in_cart_totals,
+)
 from recipes.models import (
     Favorite,
     Recipe,
@@ -46,6 +53,11 @@ class RecipeAdmin(admin.ModelAdmin):
         )
         return queryset
 
+    def save_related(self, request, form, formsets, change):
+        previous_amounts = get_recipe_amounts(form.instance.pk)
+        super().save_related(request, form, formsets, change)
+        sync_recipe_in_cart_totals(form.instance.pk, previous_amounts)
+
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
@@ -68,5 +80,26 @@ class ShoppingCartAdmin(admin.ModelAdmin):
         queryset = queryset.select_related("user", "recipe__author")
         return queryset
 
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        if change:
+            previous = ShoppingCart.objects.get(pk=obj.pk)
+            remove_recipes_from_cart_totals(
+                previous.user_id, [previous.recipe_id]
+            )
+        super().save_model(request, obj, form, change)
+        add_recipes_to_cart_totals(obj.user_id, [obj.recipe_id])
+
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        remove_recipes_from_cart_totals(obj.user_id, [obj.recipe_id])
+        super().delete_model(request, obj)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        for cart in queryset:
+            remove_recipes_from_cart_totals(cart.user_id, [cart.recipe_id])
+        super().delete_queryset(request, queryset)
+
 
 admin.site.empty_value_display = "Отсутствует"
@@ -0,0 +1,146 @@
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+
+from recipes.models import (
+    RecipeIngredient,
+    ShoppingCart,
+    ShoppingCartIngredient,
+)
+
+CART_UPSERT_BATCH_SIZE = 1000
+
+
+def get_recipe_amounts(recipe_id):
+    return get_recipes_amounts([recipe_id])
+
+
+def get_recipes_amounts(recipe_ids):
+    amounts = Counter()
+    for ingredient_id, amount in RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list("ingredient_id", "amount"):
+        amounts[ingredient_id] += amount
+    return amounts
+
+
+def get_cart_amounts(user_ids=None):
+    rows = RecipeIngredient.objects.filter(
+        recipe__shopping_carts__isnull=False
+    )
+    if user_ids is not None:
+        rows = rows.filter(recipe__shopping_carts__user__in=user_ids)
+    amounts = Counter()
+    for user_id, ingredient_id, amount in rows.values_list(
+        "recipe__shopping_carts__user", "ingredient_id", "amount"
+    ):
+        amounts[(user_id, ingredient_id)] += amount
+    return amounts
+
+
+def add_cart_amounts(user_ids, amounts):
+    table = connection.ops.quote_name(ShoppingCartIngredient._meta.db_table)
+    rows = [
+        (user_id, ingredient_id, amount)
+        for user_id in user_ids
+        for ingredient_id, amount in amounts.items()
+    ]
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), CART_UPSERT_BATCH_SIZE):
+            batch = rows[start:start + CART_UPSERT_BATCH_SIZE]
+            cursor.execute(
+                f"INSERT INTO {table} (user_id, ingredient_id, amount) "
+                f"VALUES {', '.join(['(%s, %s, %s)'] * len(batch))} "
+                f"ON CONFLICT (user_id, ingredient_id) DO UPDATE "
+                f"SET amount = {table}.amount + excluded.amount",
+                [value for row in batch for value in row],
+            )
+
+
+def subtract_cart_amounts(user_ids, amounts):
+    rows = ShoppingCartIngredient.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=amounts
+    )
+    rows.update(
+        amount=Greatest(
+            F("amount")
+            - Case(
+                *(
+                    When(ingredient_id=ingredient_id, then=Value(amount))
+                    for ingredient_id, amount in amounts.items()
+                ),
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        )
+    )
+    rows.filter(amount=0).delete()
+
+
+def apply_cart_delta(user_ids, delta):
+    added = {
+        ingredient_id: amount
+        for ingredient_id, amount in delta.items()
+        if amount > 0
+    }
+    removed = {
+        ingredient_id: -amount
+        for ingredient_id, amount in delta.items()
+        if amount < 0
+    }
+    if not user_ids or not (added or removed):
+        return
+    with transaction.atomic():
+        if added:
+            add_cart_amounts(user_ids, added)
+        if removed:
+            subtract_cart_amounts(user_ids, removed)
+
+
+def add_recipes_to_cart_totals(user_id, recipe_ids):
+    if recipe_ids:
+        apply_cart_delta([user_id], get_recipes_amounts(recipe_ids))
+
+
+def remove_recipes_from_cart_totals(user_id, recipe_ids):
+    if not recipe_ids:
+        return
+    amounts = get_recipes_amounts(recipe_ids)
+    apply_cart_delta(
+        [user_id],
+        {ingredient_id: -amount for ingredient_id, amount in amounts.items()},
+    )
+
+
+def remove_recipe_from_all_cart_totals(recipe_id):
+    sync_recipe_in_cart_totals(recipe_id, get_recipe_amounts(recipe_id), {})
+
+
+def sync_recipe_in_cart_totals(recipe_id, previous_amounts, amounts=None):
+    if amounts is None:
+        amounts = get_recipe_amounts(recipe_id)
+    delta = Counter(amounts)
+    delta.subtract(previous_amounts)
+    if not any(delta.values()):
+        return
+    user_ids = list(
+        ShoppingCart.objects.filter(recipe_id=recipe_id).values_list(
+            "user_id", flat=True
+        )
+    )
+    apply_cart_delta(user_ids, delta)
+
+
+def rebuild_cart_totals():
+    amounts = get_cart_amounts()
+    with transaction.atomic():
+        ShoppingCartIngredient.objects.all().delete()
+        ShoppingCartIngredient.objects.bulk_create(
+            ShoppingCartIngredient(
+                user_id=user_id, ingredient_id=ingredient_id, amount=amount
+            )
+            for (user_id, ingredient_id), amount in amounts.items()
+        )
+    return len(amounts)
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.cart_totals import get_cart_amounts, rebuild_cart_totals
+from recipes.models import ShoppingCartIngredient
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает суммарные ингредиенты списков покупок"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Только сравнить с корзинами, не изменяя данные",
+        )
+
+    def handle(self, *args, **options):
+        if not options["check"]:
+            rows = rebuild_cart_totals()
+            self.stdout.write(
+                self.style.SUCCESS(f"Пересчитано записей: {rows}")
+            )
+            return
+        expected = get_cart_amounts()
+        stored = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in (
+                ShoppingCartIngredient.objects.values_list(
+                    "user_id", "ingredient_id", "amount"
+                )
+            )
+        }
+        mismatched = [
+            key
+            for key in expected.keys() | stored.keys()
+            if expected.get(key) != stored.get(key)
+        ]
+        if mismatched:
+            raise CommandError(f"Расхождений: {len(mismatched)}")
+        self.stdout.write(self.style.SUCCESS("Расхождений нет"))
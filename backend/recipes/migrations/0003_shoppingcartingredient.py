@@ -0,0 +1,63 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ingredients", "0001_initial"),
+        ("recipes", "0002_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ShoppingCartIngredient",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "amount",
+                    models.PositiveIntegerField(verbose_name="Количество"),
+                ),
+                (
+                    "ingredient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="ingredients.ingredient",
+                        verbose_name="Ингредиент",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Ингредиент в списке покупок",
+                "verbose_name_plural": "Ингредиенты в списке покупок",
+                "ordering": ("user",),
+                "default_related_name": "cart_ingredients",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "ingredient"),
+                        name="cart_ingredient_unique",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0003_shoppingcartingredient"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="recipe_created_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["author", "-created_at", "-id"],
+                name="recipe_author_created_id_idx",
+            ),
+        ),
+    ]
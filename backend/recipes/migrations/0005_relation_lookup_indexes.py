@@ -0,0 +1,67 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ingredients", "0001_initial"),
+        ("recipes", "0004_recipe_keyset_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="favorite",
+            index=models.Index(
+                fields=["recipe", "user"], name="favorite_recipe_user_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipeingredient",
+            index=models.Index(
+                fields=["recipe", "ingredient"],
+                include=("amount",),
+                name="recipe_ingredient_amount_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="shoppingcart",
+            index=models.Index(
+                fields=["recipe", "user"], name="shopping_recipe_user_idx"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="favorite",
+            name="recipe",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="recipes.recipe",
+                verbose_name="Рецепт",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="recipeingredient",
+            name="recipe",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="recipes.recipe",
+                verbose_name="Рецепт",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="shoppingcart",
+            name="recipe",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="recipes.recipe",
+                verbose_name="Рецепт",
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+import secrets
+import string
+
+from django.db import migrations
+
+BASE62_ALPHABET = string.digits + string.ascii_letters
+SHORT_LINK_LENGTH = 6
+
+
+def backfill_short_links(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    used = set(
+        Recipe.objects.exclude(short_link__isnull=True).values_list(
+            "short_link", flat=True
+        )
+    )
+    recipes = list(Recipe.objects.filter(short_link__isnull=True))
+    for recipe in recipes:
+        code = None
+        while code is None or code in used or code.isdigit():
+            code = "".join(
+                secrets.choice(BASE62_ALPHABET)
+                for _ in range(SHORT_LINK_LENGTH)
+            )
+        used.add(code)
+        recipe.short_link = code
+    Recipe.objects.bulk_update(recipes, ["short_link"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0005_relation_lookup_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            backfill_short_links, migrations.RunPython.noop
+        ),
+    ]
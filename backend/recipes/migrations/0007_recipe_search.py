@@ -0,0 +1,52 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:13
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0006_backfill_recipe_short_links"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="recipe",
+            name="search_vector",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.contrib.postgres.search.CombinedSearchVector(
+                    django.contrib.postgres.search.SearchVector(
+                        "name", config="russian", weight="A"
+                    ),
+                    "||",
+                    django.contrib.postgres.search.SearchVector(
+                        "text", config="russian", weight="B"
+                    ),
+                    django.contrib.postgres.search.SearchConfig("russian"),
+                ),
+                output_field=django.contrib.postgres.search.SearchVectorField(),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="recipe_search_vector_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("name"),
+                    name="gin_trgm_ops",
+                ),
+                name="recipe_name_trgm_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0007_recipe_search"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="image_variants_source",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=100,
+                verbose_name="Изображение, для которого созданы копии",
+            ),
+        ),
+    ]
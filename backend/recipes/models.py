@@ -1,5 +1,8 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.db.models.functions import Upper
 
 from foodgram_back.settings import (
     MIN_INGREDIENT_AMOUNT,
@@ -7,7 +10,9 @@ from foodgram_back.settings import (
     MAX_RECIPE_NAME_LENGTH,
     MAX_COOKING_TIME,
     MAX_INGREDIENT_AMOUNT,
+    RECIPE_SEARCH_CONFIG,
 )
+from recipes.short_links import generate_short_link
 from users.models import User
 
 
@@ -37,22 +42,61 @@ class Recipe(models.Model):
         "Короткая ссылка", blank=True, unique=True, null=True
     )
     image = models.ImageField("Изображение", upload_to="recipes/pics/")
+    image_variants_source = models.CharField(
+        "Изображение, для которого созданы копии",
+        max_length=100,
+        blank=True,
+        editable=False,
+    )
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector("name", weight="A", config=RECIPE_SEARCH_CONFIG)
+            + SearchVector("text", weight="B", config=RECIPE_SEARCH_CONFIG)
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
 
     class Meta:
         default_related_name = "recipes"
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(
+                fields=["-created_at", "-id"], name="recipe_created_id_idx"
+            ),
+            models.Index(
+                fields=["author", "-created_at", "-id"],
+                name="recipe_author_created_id_idx",
+            ),
+            GinIndex(
+                fields=["search_vector"], name="recipe_search_vector_idx"
+            ),
+            GinIndex(
+                OpClass(Upper("name"), name="gin_trgm_ops"),
+                name="recipe_name_trgm_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name}. Автор: {self.author}"
 
+    def save(self, *args, **kwargs):
+        if not self.short_link:
+            self.short_link = generate_short_link(
+                lambda code: Recipe.objects.filter(short_link=code).exists()
+            )
+        super().save(*args, **kwargs)
+
 
 class RecipeIngredient(models.Model):
+    # Covered by recipe_ingredient_amount_idx.
     recipe = models.ForeignKey(
         Recipe,
         verbose_name="Рецепт",
         on_delete=models.CASCADE,
+        db_index=False,
     )
     ingredient = models.ForeignKey(
         "ingredients.Ingredient",
@@ -72,6 +116,13 @@ class RecipeIngredient(models.Model):
         verbose_name = "Ингридиенты рецепта"
         verbose_name_plural = "Ингридиенты рецепта"
         ordering = ("ingredient",)
+        indexes = [
+            models.Index(
+                fields=["recipe", "ingredient"],
+                include=["amount"],
+                name="recipe_ingredient_amount_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Ингридиент {self.ingredient} в количестве {self.amount}."
@@ -81,8 +132,12 @@ class ShoppingCart(models.Model):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, verbose_name="Пользователь"
     )
+    # Covered by the (recipe, user) lookup index below.
     recipe = models.ForeignKey(
-        Recipe, on_delete=models.CASCADE, verbose_name="Рецепт"
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name="Рецепт",
+        db_index=False,
     )
 
     class Meta:
@@ -96,6 +151,11 @@ class ShoppingCart(models.Model):
                 fields=["user", "recipe"],
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["recipe", "user"], name="shopping_recipe_user_idx"
+            ),
+        ]
 
     def __str__(self):
         return (f"Список покупок нужных инградиентов пользователя {self.user} "
@@ -106,8 +166,12 @@ class Favorite(models.Model):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, verbose_name="Пользователь"
     )
+    # Covered by the (recipe, user) lookup index below.
     recipe = models.ForeignKey(
-        Recipe, on_delete=models.CASCADE, verbose_name="Рецепт"
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name="Рецепт",
+        db_index=False,
     )
 
     class Meta:
@@ -121,6 +185,39 @@ class Favorite(models.Model):
                 fields=["user", "recipe"],
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["recipe", "user"], name="favorite_recipe_user_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"Рецепт {self.recipe} в избранном у пользователя {self.user}"
+
+
+class ShoppingCartIngredient(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, verbose_name="Пользователь"
+    )
+    ingredient = models.ForeignKey(
+        "ingredients.Ingredient",
+        on_delete=models.CASCADE,
+        verbose_name="Ингредиент",
+    )
+    amount = models.PositiveIntegerField("Количество")
+
+    class Meta:
+        ordering = ("user",)
+        default_related_name = "cart_ingredients"
+        verbose_name = "Ингредиент в списке покупок"
+        verbose_name_plural = "Ингредиенты в списке покупок"
+        constraints = [
+            models.UniqueConstraint(
+                name="cart_ingredient_unique",
+                fields=["user", "ingredient"],
+            )
+        ]
+
+    def __str__(self):
+        return (f"Ингредиент {self.ingredient} в количестве {self.amount} "
+                f"в списке покупок пользователя {self.user}")
@@ -0,0 +1,29 @@
+from django.db import connection
+
+from recipes.models import Recipe
+
+
+def add_relations(model, user_id, recipe_ids):
+    table = connection.ops.quote_name(model._meta.db_table)
+    recipes = connection.ops.quote_name(Recipe._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (user_id, recipe_id) "
+            f"SELECT %s, id FROM {recipes} WHERE id = ANY(%s) "
+            f"ON CONFLICT (user_id, recipe_id) DO NOTHING "
+            f"RETURNING recipe_id",
+            [user_id, list(recipe_ids)],
+        )
+        return [recipe_id for recipe_id, in cursor.fetchall()]
+
+
+def remove_relations(model, user_id, recipe_ids):
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} "
+            f"WHERE user_id = %s AND recipe_id = ANY(%s) "
+            f"RETURNING recipe_id",
+            [user_id, list(recipe_ids)],
+        )
+        return [recipe_id for recipe_id, in cursor.fetchall()]
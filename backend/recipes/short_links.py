@@ -0,0 +1,76 @@
+import secrets
+import string
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from foodgram_back.settings import (
+    SHORT_LINK_CACHE_SIZE,
+    SHORT_LINK_LENGTH,
+    SHORT_LINK_NEGATIVE_TTL,
+)
+
+BASE62_ALPHABET = string.digits + string.ascii_letters
+
+
+def generate_short_link(exists):
+    while True:
+        code = "".join(
+            secrets.choice(BASE62_ALPHABET) for _ in range(SHORT_LINK_LENGTH)
+        )
+        # Numeric codes are reserved for links made from recipe ids
+        if not code.isdigit() and not exists(code):
+            return code
+
+
+class ShortLinkResolver:
+    def __init__(self, max_size=SHORT_LINK_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = Lock()
+        self._entries = OrderedDict()
+
+    def _get(self, code):
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry is None:
+                return False, None
+            recipe_id, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[code]
+                return False, None
+            self._entries.move_to_end(code)
+            return True, recipe_id
+
+    def _set(self, code, recipe_id):
+        expires_at = (
+            None
+            if recipe_id is not None
+            else time.monotonic() + SHORT_LINK_NEGATIVE_TTL
+        )
+        with self._lock:
+            self._entries[code] = (recipe_id, expires_at)
+            self._entries.move_to_end(code)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def forget(self, code):
+        with self._lock:
+            self._entries.pop(code, None)
+
+    def resolve(self, code):
+        found, recipe_id = self._get(code)
+        if found:
+            return recipe_id
+        from recipes.models import Recipe
+
+        lookup = {"pk": int(code)} if code.isdigit() else {"short_link": code}
+        recipe_id = (
+            Recipe.objects.filter(**lookup)
+            .values_list("id", flat=True)
+            .first()
+        )
+        self._set(code, recipe_id)
+        return recipe_id
+
+
+short_link_resolver = ShortLinkResolver()
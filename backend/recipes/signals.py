@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+
+from recipes.cart_totals import remove_recipe_from_all_cart_totals
+from recipes.models import Recipe
+from recipes.short_links import short_link_resolver
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_from_cart_totals(sender, instance, **kwargs):
+    remove_recipe_from_all_cart_totals(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_short_link(sender, instance, **kwargs):
+    if instance.short_link:
+        short_link_resolver.forget(instance.short_link)
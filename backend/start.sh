@@ -10,10 +10,16 @@ echo "PostgreSQL is available, proceeding..."
 
 python manage.py migrate
 
+rm -rf "${METRICS_DIR:-/tmp/foodgram-metrics}"
+
 python manage.py collectstatic --noinput
 
 python manage.py load_data /app/ingredients.json
 
+# Variants are generated in a thread of the worker that saved the image, so
+# jobs queued before a restart are lost; finish them in the background.
+python manage.py generate_image_variants --pending &
+
 python manage.py shell << END
 from django.contrib.auth import get_user_model
 User = get_user_model()
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-18 07:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_alter_subscription_author_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="subscription",
+            index=models.Index(
+                fields=["author", "subscriber"],
+                name="subscription_author_idx",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="subscription",
+            name="author",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="followers",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Автор",
+            ),
+        ),
+    ]
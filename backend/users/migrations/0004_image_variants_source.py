@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_subscription_subscription_author_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="avatar_variants_source",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=100,
+                verbose_name="Аватар, для которого созданы копии",
+            ),
+        ),
+    ]
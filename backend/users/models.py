@@ -42,6 +42,12 @@ class User(AbstractUser):
     avatar = models.ImageField(
         "Аватар", upload_to="users/", null=True, default="userpic-icon.jpg"
     )
+    avatar_variants_source = models.CharField(
+        "Аватар, для которого созданы копии",
+        max_length=100,
+        blank=True,
+        editable=False,
+    )
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username", "first_name", "last_name", "password"]
@@ -62,11 +68,13 @@ class Subscription(models.Model):
         verbose_name="Подписчик",
         related_name="subscriptions",
     )
+    # Covered by subscription_author_idx.
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         verbose_name="Автор",
         related_name="followers",
+        db_index=False,
     )
 
     class Meta:
@@ -79,6 +87,12 @@ class Subscription(models.Model):
                 name="unique_subscriber_author",
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=["author", "subscriber"],
+                name="subscription_author_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.subscriber} подписан на {self.author}"